@@ -3,12 +3,16 @@ APRetriever FastAPI Search Service - 完整版本
 """
 
 import os
+import logging
 import json
 import re
+import asyncio
+import heapq
 import urllib.parse
 import openai
-from typing import List, Tuple, Optional
+from typing import Any, Dict, List, Tuple, Optional
 from datetime import datetime, timezone
+from cachetools import TTLCache
 
 # 加载环境变量
 from dotenv import load_dotenv
@@ -16,18 +20,19 @@ load_dotenv()
 
 from fastapi import FastAPI, BackgroundTasks, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from opensearchpy import OpenSearch
+from fastapi.middleware.gzip import GZipMiddleware
+from opensearchpy import AsyncOpenSearch
 
 # 导入工具模块
-import sys
-sys.path.append('.')
-from utils.embedding import BGEM3Embedder
+from utils.embedding import BGEM3Embedder, AsyncEmbeddingBatcher
 from utils.rerank import BGEReranker
 from utils.query_expansion import expand_query
 from utils.settings import settings
 from utils.models import SearchRequest, SearchResult, SearchResponse, AsyncSearchInitiatedResponse
 from utils.search_cache import SearchCache
 
+logger = logging.getLogger(__name__)
+
 # 禁用Python字节码缓存
 os.environ['PYTHONDONTWRITEBYTECODE'] = '1'
 os.environ['PYTHONUNBUFFERED'] = '1'
@@ -36,6 +41,58 @@ os.environ['PYTHONUNBUFFERED'] = '1'
 openai.api_key = os.getenv("OPENAI_API_KEY", "")
 openai.api_base = os.getenv("OPENAI_API_BASE", "http://127.0.0.1:8000/v1")
 
+# 全局复用的异步OpenAI客户端，避免每次评估都重新建立HTTP连接且不阻塞事件循环；
+# 首次评估时才创建，未配置OPENAI_API_KEY时（如本地vLLM）导入模块不会因缺少凭据而失败
+_llm_client: "openai.AsyncOpenAI | None" = None
+
+
+def _get_llm_client() -> openai.AsyncOpenAI:
+    """获取共享的异步OpenAI客户端（延迟初始化，只在事件循环线程中调用）"""
+    global _llm_client
+    if _llm_client is None:
+        _llm_client = openai.AsyncOpenAI(api_key=openai.api_key, base_url=openai.api_base)
+    return _llm_client
+
+# 结果数超过该阈值时，排序等CPU密集操作放到线程中执行，避免阻塞事件循环
+_CPU_OFFLOAD_THRESHOLD = 1000
+
+# 搜索响应只保留代码实际用到的字段，减少OpenSearch返回和解析的数据量
+_SEARCH_FILTER_PATH = ",".join([
+    "hits.total",
+    "hits.hits._source",
+    "hits.hits._score",
+    "hits.hits.matched_queries",
+    "hits.hits.sort",
+])
+
+# 查询构建用的固定结构：字段权重与外层模板只构建一次，每次请求只填充变化的部分
+_PHRASE_FIELD_BOOSTS = (("title", 5), ("keywords", 10), ("abstract", 2))  # 标题/关键词/摘要权重
+_SOURCE_FIELDS = ["id", "title", "abstract", "keywords"]
+_QUERY_TEMPLATE = {"_source": _SOURCE_FIELDS}
+_KEYWORD_SORT = [{"_score": "desc"}, {"id": "asc"}]
+
+# 预编译的正则表达式
+_JSON_TAG_RE = re.compile(r'<json>(.*?)</json>', re.DOTALL)  # <json>标签中的内容
+_JSON_FENCE_RE = re.compile(r'```json\s*(.*?)\s*```', re.DOTALL)  # ```json ```中的内容
+
+# LLM相关性评估提示词：系统消息与模板固定不变，每次调用只填充查询和文本，
+# 同一查询批次内共享相同前缀，便于推理服务复用前缀缓存
+_RELEVANCE_SYSTEM_MSG = {"role": "system", "content": "你是一个专业的医学文献相关性评估专家。请严格按照用户的要求格式输出结果。"}
+_RELEVANCE_TEMPLATE = """你是一个医学文献筛选助手。我会提供一个医学topic和下列医学文献的摘要。你的任务是判断这篇文献是否与该疾病相关，并按照以下规则输出结果：
+
+如果摘要主要讨论该疾病，返回 true，并给出理由（不超过15字）。
+如果摘要侧面提到该疾病（例如作为背景、对比或次要内容），返回 true，并给出理由（不超过15字）。
+如果摘要与该疾病完全无关，返回 false，并给出理由（不超过15字）。
+
+医学topic：{query}
+文献摘要：{text}
+
+始终以 JSON 格式输出，并包裹在 <json></json> 标签中。
+JSON 结构如下：{{
+  "is_relevant": IF_RELEVANT,
+  "reason": REASON
+}}"""
+
 class AsyncPaperSearch:
     """Async论文搜索引擎类"""
     
@@ -43,9 +100,18 @@ class AsyncPaperSearch:
         """初始化搜索引擎"""
         self.opensearch_client = None
         self.embedder = None
+        self.embedding_batcher = None
         self.reranker = None
         self.cache = None
         
+        # 进程内缓存（位于S3+DynamoDB缓存之前），以及防止并发重复查询的按键锁
+        self._local_cache = TTLCache(maxsize=settings.LOCAL_CACHE_MAXSIZE, ttl=settings.LOCAL_CACHE_TTL)
+        self._local_cache_locks: Dict[tuple, asyncio.Lock] = {}
+        # search_id -> 进程内缓存键集合，删除缓存结果时据此移除本地条目；与本地缓存同样按TTL过期
+        self._local_cache_ids = TTLCache(maxsize=settings.LOCAL_CACHE_MAXSIZE, ttl=settings.LOCAL_CACHE_TTL)
+        self._warmup_task: Optional[asyncio.Task] = None
+        self._inflight_writes: Dict[tuple, Tuple[str, asyncio.Task]] = {}  # 后台进行中的缓存写入
+        
         # 初始化各个服务
         self._init_opensearch()
         self._init_embedder()
@@ -58,11 +124,15 @@ class AsyncPaperSearch:
             self.cache = SearchCache(
                 bucket_name=settings.S3_BUCKET_NAME,
                 table_name=settings.DYNAMODB_TABLE_NAME,
-                region_name=settings.DYNAMODB_REGION
+                region_name=settings.DYNAMODB_REGION,
+                background_writes=settings.CACHE_BACKGROUND_WRITES,
+                inline_max_bytes=settings.CACHE_INLINE_MAX_BYTES,
+                bloom_capacity=settings.CACHE_BLOOM_CAPACITY,
+                primary_key=settings.DYNAMODB_PRIMARY_KEY
             )
-            print("✅ S3+DynamoDB缓存初始化成功 (使用 SearchCache)")
+            logger.info("✅ S3+DynamoDB缓存初始化成功 (使用 SearchCache)")
         except Exception as e:
-            print(f"❌ 缓存初始化失败: {e}")
+            logger.error("❌ 缓存初始化失败: %s", e)
             self.cache = None
     
     def _init_opensearch(self):
@@ -70,51 +140,54 @@ class AsyncPaperSearch:
         if all([settings.OPENSEARCH_HOST, settings.OPENSEARCH_PORT, 
                 settings.OPENSEARCH_USERNAME, settings.OPENSEARCH_PASSWORD]):
             try:
-                self.opensearch_client = OpenSearch(
+                self.opensearch_client = AsyncOpenSearch(
                     hosts=[{'host': settings.OPENSEARCH_HOST, 'port': settings.OPENSEARCH_PORT}],
                     http_auth=(settings.OPENSEARCH_USERNAME, settings.OPENSEARCH_PASSWORD),
                     use_ssl=True,
                     verify_certs=False,
-                    ssl_show_warn=False
+                    ssl_show_warn=False,
+                    http_compress=True,  # 请求/响应启用gzip压缩
+                    maxsize=settings.OPENSEARCH_MAX_CONNECTIONS  # aiohttp连接池上限
                 )
-                print("✅ OpenSearch客户端初始化成功")
+                logger.info("✅ OpenSearch客户端初始化成功")
             except Exception as e:
-                print(f"❌ OpenSearch客户端初始化失败: {e}")
+                logger.error("❌ OpenSearch客户端初始化失败: %s", e)
         else:
-            print("⚠️  OpenSearch配置不完整，客户端未初始化")
+            logger.warning("⚠️  OpenSearch配置不完整，客户端未初始化")
     
     def _init_embedder(self):
         """初始化BGE-M3嵌入服务"""
         if settings.SAGEMAKER_ENDPOINT_NAME:
             try:
-                self.embedder = BGEM3Embedder(settings.SAGEMAKER_ENDPOINT_NAME)
-                print("✅ BGE-M3嵌入服务初始化成功")
+                self.embedder = BGEM3Embedder(
+                    settings.SAGEMAKER_ENDPOINT_NAME,
+                    accept_npy=settings.EMBEDDING_ACCEPT_NPY,
+                    dtype=settings.EMBEDDING_DTYPE
+                )
+                # 合并并发搜索的查询嵌入请求
+                self.embedding_batcher = AsyncEmbeddingBatcher(
+                    self.embedder,
+                    max_batch=settings.EMBEDDING_MAX_BATCH,
+                    max_wait_ms=settings.EMBEDDING_MAX_WAIT_MS
+                )
+                logger.info("✅ BGE-M3嵌入服务初始化成功")
             except Exception as e:
-                print(f"❌ BGE-M3嵌入服务初始化失败: {e}")
+                logger.error("❌ BGE-M3嵌入服务初始化失败: %s", e)
         else:
-            print("⚠️  未配置SAGEMAKER_ENDPOINT_NAME，嵌入服务不可用")
+            logger.warning("⚠️  未配置SAGEMAKER_ENDPOINT_NAME，嵌入服务不可用")
     
     def _init_reranker(self):
         """初始化BGE重排序服务"""
         if settings.ENABLE_RERANK and settings.SAGEMAKER_ENDPOINT_RERANK_NAME:
             try:
-                self.reranker = BGEReranker(settings.SAGEMAKER_ENDPOINT_RERANK_NAME)
-                print("✅ BGE重排序服务初始化成功")
+                self.reranker = BGEReranker(settings.SAGEMAKER_ENDPOINT_RERANK_NAME, chunk_size=settings.RERANK_BATCH_SIZE)
+                logger.info("✅ BGE重排序服务初始化成功")
             except Exception as e:
-                print(f"❌ BGE重排序服务初始化失败: {e}")
+                logger.error("❌ BGE重排序服务初始化失败: %s", e)
         else:
-            print("⚠️  重排序服务未启用或未配置")
+            logger.warning("⚠️  重排序服务未启用或未配置")
     
-    def extract_matched_keywords(self, highlight: dict) -> List[str]:
-        """提取匹配的关键词"""
-        matched = []
-        for field, highlights in highlight.items():
-            for highlight_text in highlights:
-                matches = re.findall(r'<em>(.*?)</em>', highlight_text)
-                matched.extend(matches)
-        return list(set(matched))
-
-    def evaluate_relevance(self, query: str, text: str, enable_llm: bool = False) -> Tuple[bool, str]:
+    async def evaluate_relevance(self, query: str, text: str, enable_llm: bool = False) -> Tuple[bool, str]:
         """
         使用LLM评估文本与查询的相关性
         
@@ -135,28 +208,12 @@ class AsyncPaperSearch:
             return True, "未配置OpenAI API"
             
         try:
-            prompt = f"""你是一个医学文献筛选助手。我会提供一个医学topic和下列医学文献的摘要。你的任务是判断这篇文献是否与该疾病相关，并按照以下规则输出结果：
-
-如果摘要主要讨论该疾病，返回 true，并给出理由（不超过15字）。
-如果摘要侧面提到该疾病（例如作为背景、对比或次要内容），返回 true，并给出理由（不超过15字）。
-如果摘要与该疾病完全无关，返回 false，并给出理由（不超过15字）。
-
-医学topic：{query}
-文献摘要：{text}
-
-始终以 JSON 格式输出，并包裹在 <json></json> 标签中。
-JSON 结构如下：{{
-  "is_relevant": IF_RELEVANT,
-  "reason": REASON
-}}"""
-            
             # 使用OpenAI API进行评估
-            client = openai.OpenAI(api_key=openai.api_key, base_url=openai.api_base)
-            response = client.chat.completions.create(
+            response = await _get_llm_client().chat.completions.create(
                 model="Qwen2.5-72B-Instruct-AWQ",
                 messages=[
-                    {"role": "system", "content": "你是一个专业的医学文献相关性评估专家。请严格按照用户的要求格式输出结果。"},
-                    {"role": "user", "content": prompt}
+                    _RELEVANCE_SYSTEM_MSG,
+                    {"role": "user", "content": _RELEVANCE_TEMPLATE.format(query=query, text=text)}
                 ],
                 temperature=0.01,
                 max_tokens=100
@@ -165,112 +222,187 @@ JSON 结构如下：{{
             result = response.choices[0].message.content.strip()
             try:
                 # 使用正则表达式匹配JSON内容
-                json_patterns = [
-                    r'<json>(.*?)</json>',  # 匹配<json>标签中的内容
-                    r'```json\s*(.*?)\s*```'  # 匹配```json ```中的内容
-                ]
-                
                 json_str = None
-                for pattern in json_patterns:
-                    matches = re.findall(pattern, result, re.DOTALL)
-                    if matches:
-                        json_str = matches[0].strip()
+                for pattern in (_JSON_TAG_RE, _JSON_FENCE_RE):
+                    match = pattern.search(result)
+                    if match:
+                        json_str = match.group(1).strip()
                         break
                 
                 if not json_str:
-                    print(f"未找到JSON内容: {result}")
+                    logger.warning("未找到JSON内容: %s", result)
                     return True, "JSON内容解析失败"
                 
                 json_result = json.loads(json_str)
                 return json_result.get('is_relevant', True), json_result.get('reason', '解析评估原因失败')
             except json.JSONDecodeError:
-                print(f"JSON解析失败: {result}")
+                logger.warning("JSON解析失败: %s", result)
                 return True, "JSON解析失败"
         except Exception as e:
-            print(f"相关性评估出错: {str(e)}")
+            logger.error("相关性评估出错: %s", e)
             return True, f"评估出错: {str(e)}"  # 出错时默认保留该结果
 
+    async def evaluate_relevance_batch(self, query: str, texts: List[str], enable_llm: bool = False) -> List[Tuple[bool, str]]:
+        """
+        批量评估多篇文本与查询的相关性
+        
+        按文本长度分组（长度相近的文本放在同一批，减少服务端padding浪费），
+        每批并发发送请求以利用LLM服务端的连续批处理；全部批次中同时进行的
+        LLM调用数不超过 LLM_MAX_WORKERS。
+        
+        Args:
+            query: 查询词
+            texts: 待评估文本列表
+            enable_llm: 是否启用LLM评估，默认为False
+            
+        Returns:
+            list: 与texts顺序一致的 (是否相关, 相关原因) 列表
+        """
+        if not enable_llm:
+            return [(True, "未启用LLM评估")] * len(texts)
+        
+        if not openai.api_key:
+            return [(True, "未配置OpenAI API")] * len(texts)
+        
+        # 未启用并发评估时逐条执行
+        if not settings.ENABLE_ASYNC_LLM:
+            return [await self.evaluate_relevance(query, text, True) for text in texts]
+        
+        # 按长度排序后切分成批次（Multi-Bin Batching）
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        batch_size = max(1, settings.LLM_BATCH_SIZE)
+        bins = [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+        
+        verdicts: List[Tuple[bool, str]] = [(True, "未评估")] * len(texts)
+        semaphore = asyncio.Semaphore(max(1, settings.LLM_MAX_WORKERS))
+        
+        async def evaluate_one(text: str) -> Tuple[bool, str]:
+            # 信号量限制的是同时进行的单次LLM调用数，而不是批次数
+            async with semaphore:
+                return await self.evaluate_relevance(query, text, True)
+        
+        async def run_bin(indices: List[int]):
+            bin_results = await asyncio.gather(*[evaluate_one(texts[i]) for i in indices])
+            for i, verdict in zip(indices, bin_results):
+                verdicts[i] = verdict
+        
+        await asyncio.gather(*[run_bin(indices) for indices in bins])
+        return verdicts
+
+    def dedupe_query_terms(self, query_terms: List[str]) -> List[str]:
+        """按忽略大小写的方式去重查询词，保留首次出现的写法和顺序"""
+        seen = set()
+        unique_terms = []
+        for term in query_terms:
+            lowered = term.lower()
+            if lowered not in seen:
+                seen.add(lowered)
+                unique_terms.append(term)
+        return unique_terms
+
+    def build_phrase_should_queries(self, query_terms: List[str], boosted: bool = True) -> List[dict]:
+        """
+        为每个查询词构建标题/关键词/摘要的短语匹配子查询
+        
+        Args:
+            query_terms: 查询词列表
+            boosted: 是否附加字段权重；RRF按排名融合，与分数无关，可关闭
+        """
+        # 每个子查询以查询词序号命名，命中文档通过matched_queries返回匹配的查询词
+        if not boosted:
+            return [
+                {"match_phrase": {field: {"query": keyword, "_name": f"term_{i}"}}}
+                for i, keyword in enumerate(self.dedupe_query_terms(query_terms))
+                for field, _ in _PHRASE_FIELD_BOOSTS
+            ]
+        
+        return [
+            {"match_phrase": {field: {"query": keyword, "boost": boost, "_name": f"term_{i}"}}}
+            for i, keyword in enumerate(self.dedupe_query_terms(query_terms))
+            for field, boost in _PHRASE_FIELD_BOOSTS
+        ]
+
+    def build_keyword_exclusion_query(self, query_terms: List[str]) -> dict:
+        """构建单个bool.should子句：文档任一字段包含任一查询词即命中（用于must_not）"""
+        return {"bool": {"should": [
+            {"match_phrase": {field: keyword}}
+            for keyword in self.dedupe_query_terms(query_terms)
+            for field, _ in _PHRASE_FIELD_BOOSTS
+        ]}}
+
     def build_hybrid_search_query(self, query_terms: List[str], query_embedding: List[float], page: int, page_size: int) -> dict:
         """构建混合搜索查询"""
         from_value = (page - 1) * page_size
         
         # 构建多个查询词的bool查询，类似关键词搜索
-        should_queries = []
-        for keyword in query_terms:
-            should_queries.extend([
-                {
-                    "match_phrase": {
-                        "title": {
-                            "query": keyword,
-                            "boost": 5  # 标题权重
-                        }
-                    }
-                },
+        use_rrf = settings.HYBRID_FUSION == "rrf"
+        should_queries = self.build_phrase_should_queries(query_terms, boosted=not use_rrf)
+        
+        hybrid_query = {
+            "queries": [
                 {
-                    "match_phrase": {
-                        "keywords": {
-                            "query": keyword,
-                            "boost": 10  # 关键词权重
-                        }
+                    "bool": {
+                        "should": should_queries,
+                        "minimum_should_match": 1  # 至少匹配一个关键词
                     }
                 },
                 {
-                    "match_phrase": {
-                        "abstract": {
-                            "query": keyword,
-                            "boost": 2  # 摘要权重
+                    "knn": {
+                        "embedding": {
+                            "vector": query_embedding,
+                            "k": page_size
                         }
                     }
                 }
-            ])
+            ]
+        }
         
-        return {
+        # OpenSearch 2.19+ 支持的子查询收集深度，需覆盖当前分页
+        if settings.HYBRID_PAGINATION_DEPTH > 0:
+            hybrid_query["pagination_depth"] = max(settings.HYBRID_PAGINATION_DEPTH, from_value + page_size)
+        
+        return dict(_QUERY_TEMPLATE, **{
             "from": from_value,
             "size": page_size,
             "query": {
-                "hybrid": {
-                    "queries": [
-                        {
-                            "bool": {
-                                "should": should_queries,
-                                "minimum_should_match": 1  # 至少匹配一个关键词
-                            }
-                        },
-                        {
-                            "knn": {
-                                "embedding": {
-                                    "vector": query_embedding,
-                                    "k": page_size
-                                }
-                            }
-                        }
+                "hybrid": hybrid_query
+            }
+        })
+
+    def hybrid_search_pipeline(self) -> str:
+        """返回混合搜索使用的search pipeline名称"""
+        if settings.HYBRID_FUSION == "rrf":
+            return settings.RRF_SEARCH_PIPELINE
+        return settings.HYBRID_SEARCH_PIPELINE
+
+    async def ensure_rrf_pipeline(self):
+        """使用RRF融合时，确保对应的search pipeline存在"""
+        if settings.HYBRID_FUSION != "rrf" or not self.opensearch_client:
+            return
+        
+        try:
+            await self.opensearch_client.transport.perform_request(
+                "PUT",
+                f"/_search/pipeline/{settings.RRF_SEARCH_PIPELINE}",
+                body={
+                    "description": "RRF fusion for hybrid search",
+                    "phase_results_processors": [
+                        {"score-ranker-processor": {"combination": {"technique": "rrf"}}}
                     ]
                 }
-            },
-            "_source": ["id", "title", "abstract", "keywords"],
-            "highlight": {
-                "fields": {
-                    "title": {},
-                    "abstract": {},
-                    "keywords": {}
-                }
-            }
-        }
+            )
+            logger.info("✅ RRF search pipeline已就绪: %s", settings.RRF_SEARCH_PIPELINE)
+        except Exception as e:
+            logger.error("❌ 创建RRF search pipeline失败: %s", e)
 
     def build_vector_search_query(self, query_embedding: List[float], query_terms: List[str], page: int, page_size: int) -> dict:
         """构建向量搜索查询"""
         from_value = (page - 1) * page_size
         
-        # 构建must_not查询
-        must_not_queries = []
-        for keyword in query_terms:
-            must_not_queries.extend([
-                {"match_phrase": {"title": keyword}},
-                {"match_phrase": {"keywords": keyword}},
-                {"match_phrase": {"abstract": keyword}}
-            ])
+        # 构建must_not查询，排除包含关键词的文档
+        must_not_queries = [self.build_keyword_exclusion_query(query_terms)]
 
-        return {
+        return dict(_QUERY_TEMPLATE, **{
             "from": from_value,
             "size": page_size,
             "query": {
@@ -285,46 +417,21 @@ JSON 结构如下：{{
                     },
                     "must_not": must_not_queries
                 }
-            },
-            "_source": ["id", "title", "abstract", "keywords"]
-        }
+            }
+        })
 
-    def build_keyword_search_query(self, query_terms: List[str], page: int, page_size: int) -> dict:
-        """构建关键词搜索查询"""
-        from_value = (page - 1) * page_size
+    def build_keyword_search_query(self, query_terms: List[str], page: int, page_size: int,
+                                   search_after: Optional[List[Any]] = None) -> dict:
+        """
+        构建关键词搜索查询
         
+        按 (_score, id) 排序以支持 search_after 游标分页；提供游标时忽略 page，
+        避免深分页带来的 from + size 开销。
+        """
         # 构建bool查询
-        should_queries = []
-        for keyword in query_terms:
-            should_queries.extend([
-                {
-                    "match_phrase": {
-                        "title": {
-                            "query": keyword,
-                            "boost": 5  # 标题权重
-                        }
-                    }
-                },
-                {
-                    "match_phrase": {
-                        "keywords": {
-                            "query": keyword,
-                            "boost": 10  # 关键词权重
-                        }
-                    }
-                },
-                {
-                    "match_phrase": {
-                        "abstract": {
-                            "query": keyword,
-                            "boost": 2  # 摘要权重
-                        }
-                    }
-                }
-            ])
+        should_queries = self.build_phrase_should_queries(query_terms)
         
-        return {
-            "from": from_value,
+        search_query = dict(_QUERY_TEMPLATE, **{
             "size": page_size,
             "query": {
                 "bool": {
@@ -332,26 +439,67 @@ JSON 结构如下：{{
                     "minimum_should_match": 1  # 至少匹配一个关键词
                 }
             },
-            "_source": ["id", "title", "abstract", "keywords"],
-            "highlight": {
-                "fields": {
-                    "title": {},
-                    "abstract": {},
-                    "keywords": {}
-                }
-            }
-        }
+            "sort": _KEYWORD_SORT
+        })
+        
+        if search_after:
+            search_query["search_after"] = search_after
+        else:
+            search_query["from"] = (page - 1) * page_size
+        
+        return search_query
 
-    def find_matched_keywords(self, keywords: List[str], hit_source: dict) -> List[str]:
-        """找出匹配的关键词"""
-        matched_keywords = []
-        for keyword in keywords:
-            # 检查标题、关键词和摘要中是否包含该关键词
-            if (keyword.lower() in hit_source['title'].lower() or
-                keyword.lower() in ' '.join(hit_source.get('keywords', [])).lower() or
-                keyword.lower() in hit_source['abstract'].lower()):
-                matched_keywords.append(keyword)
-        return matched_keywords
+    def find_matched_keywords(self, keywords: List[str], hit_source: dict,
+                              lowered_keywords: Optional[List[str]] = None) -> List[str]:
+        """
+        找出匹配的关键词
+        
+        Args:
+            keywords: 查询词列表
+            hit_source: 文档_source
+            lowered_keywords: 预先转为小写的查询词（与keywords一一对应），
+                由调用方每个请求计算一次，避免对每个文档重复转换
+        """
+        if lowered_keywords is None:
+            lowered_keywords = [keyword.lower() for keyword in keywords]
+        
+        # 每个字段只转换一次小写
+        title = hit_source['title'].lower()
+        doc_keywords = ' '.join(hit_source.get('keywords', [])).lower()
+        abstract = hit_source['abstract'].lower()
+        
+        # 检查标题、关键词和摘要中是否包含该关键词
+        return [
+            keyword for keyword, lowered in zip(keywords, lowered_keywords)
+            if lowered in title or lowered in doc_keywords or lowered in abstract
+        ]
+
+    def matched_terms_for_hit(self, unique_terms: List[str], hit: dict,
+                              lowered_terms: List[str], named_queries_supported: bool = False) -> List[str]:
+        """
+        根据命名查询返回文档匹配的查询词
+        
+        Args:
+            unique_terms: 去重后的查询词（与子查询名称 term_{i} 的序号对应）
+            hit: OpenSearch命中文档
+            lowered_terms: 预先转为小写的 unique_terms
+            named_queries_supported: 本次响应中已有文档返回matched_queries，
+                此时未返回的文档说明没有命中任何短语子查询，无需再做字符串匹配
+        """
+        matched_queries = hit.get('matched_queries')
+        if matched_queries:
+            # matched_queries 可能是名称列表，也可能是名称到分数的映射
+            indices = sorted({
+                int(name[5:]) for name in matched_queries
+                if name.startswith("term_") and name[5:].isdigit()
+            })
+            return [unique_terms[i] for i in indices if i < len(unique_terms)]
+        
+        if named_queries_supported:
+            return []
+        
+        # 集群未返回命名查询时，退回字符串匹配
+        return self.find_matched_keywords(unique_terms, hit['_source'], lowered_terms)
 
     async def search(self, request: SearchRequest) -> SearchResponse:
         """执行搜索"""
@@ -363,10 +511,10 @@ JSON 结构如下：{{
             # 解决URL编码问题
             try:
                 query = urllib.parse.unquote(request.query)
-                print(f"解码后的查询: {query}")
-                print(f"LLM相关性评估: {'启用' if request.enableLlm else '禁用'}")
+                logger.debug("解码后的查询: %s", query)
+                logger.debug("LLM相关性评估: %s", '启用' if request.enableLlm else '禁用')
             except Exception as e:
-                print(f"URL解码出错: {str(e)}")
+                logger.error("URL解码出错: %s", e)
                 query = request.query
             
             if not query:
@@ -377,36 +525,32 @@ JSON 结构如下：{{
                     rewrittenTerms=None
                 )
 
-            # 首先尝试从缓存中获取结果
-            if self.cache:
-                cached_response = self.cache.get_cached_response_by_query_and_type(
-                    query_text=query,
-                    search_type=request.searchType,
-                    enable_llm=request.enableLlm
-                )
-                if cached_response:
-                    print(f"✅ 缓存命中！查询: '{query}', 类型: {request.searchType}, LLM: {request.enableLlm}. 返回缓存结果 (ID: {cached_response.search_id})")
-                    # 确保search_id在返回的响应中，如果缓存中没有，则可能需要重新生成或标记
-                    # 但get_cached_response_by_query_and_type应该已经处理了search_id的填充
-                    return cached_response
-                else:
-                    print(f"ℹ️  缓存未命中。查询: '{query}', 类型: {request.searchType}, LLM: {request.enableLlm}. 继续执行搜索...")
-            
-            print(f"搜索类型: {request.searchType}, 查询: {query}")
+            # 首先尝试从进程内缓存中获取结果
+            cache_key = self._local_cache_key(query, request)
+            cached_response = self._local_cache.get(cache_key)
+            if cached_response is not None:
+                logger.debug("⚡ 进程内缓存命中！查询: '%s', 类型: %s", query, request.searchType)
+                return cached_response
             
-            # 查询扩展
-            query_terms = expand_query(query)
-            print(f"扩展后的搜索词: {query_terms}")
-            
-            if request.searchType == 'hybrid':
-                return await self._hybrid_search(query, query_terms, request)
-            elif request.searchType == 'vector':
-                return await self._vector_search(query, query_terms, request)
-            else:
-                return await self._keyword_search(query, query_terms, request)
+            # 相同查询并发到达时只执行一次后端搜索，其余请求等待结果
+            lock = self._local_cache_locks.setdefault(cache_key, asyncio.Lock())
+            try:
+                async with lock:
+                    cached_response = self._local_cache.get(cache_key)
+                    if cached_response is None:
+                        cached_response = await self._run_search(query, request)
+                        self._local_cache[cache_key] = cached_response
+                        if cached_response.search_id:
+                            keys = self._local_cache_ids.get(cached_response.search_id) or set()
+                            keys.add(cache_key)
+                            self._local_cache_ids[cached_response.search_id] = keys
+                    return cached_response
+            finally:
+                if self._local_cache_locks.get(cache_key) is lock:
+                    del self._local_cache_locks[cache_key]
             
         except Exception as e:
-            print(f"搜索错误: {str(e)}")
+            logger.error("搜索错误: %s", e)
             return SearchResponse(
                 total=0,
                 results=[],
@@ -414,19 +558,75 @@ JSON 结构如下：{{
                 rewrittenTerms=None
             )
 
-    async def _hybrid_search(self, query: str, query_terms: List[str], request: SearchRequest) -> SearchResponse:
-        """混合搜索"""
+    def invalidate_local_cache(self, search_id: str):
+        """移除进程内缓存中search_id对应的搜索结果，避免删除后继续返回已删除的search_id"""
+        for cache_key in self._local_cache_ids.pop(search_id, ()):
+            self._local_cache.pop(cache_key, None)
+
+    def _local_cache_key(self, query: str, request: SearchRequest) -> tuple:
+        """生成进程内缓存键"""
+        query_normalized = " ".join(query.split()).lower()
+        search_after = tuple(request.searchAfter) if request.searchAfter else None
+        return (request.searchType, request.page, request.pageSize, request.enableLlm,
+                request.deepRecall, search_after, query_normalized)
+
+    @staticmethod
+    def _reusable_page_size(request: SearchRequest) -> Optional[int]:
+        """
+        可按查询文本复用S3+DynamoDB缓存时返回每页大小，否则返回None
+        
+        按查询文本的缓存查找不区分页码、游标和深度召回，只复用第一页、无游标且未深度召回的结果。
+        """
+        if request.page != 1 or request.searchAfter or request.deepRecall:
+            return None
+        return request.pageSize
+
+    async def _run_search(self, query: str, request: SearchRequest) -> SearchResponse:
+        """依次查询S3+DynamoDB缓存和后端搜索服务"""
+        # 尝试从S3+DynamoDB缓存中获取结果
+        page_size = self._reusable_page_size(request)
+        if self.cache and page_size:
+            cached_response = await self.cache.aget_cached_response_by_query_and_type(
+                query_text=query,
+                search_type=request.searchType,
+                enable_llm=request.enableLlm,
+                page_size=page_size
+            )
+            if cached_response:
+                logger.debug("✅ 缓存命中！查询: '%s', 类型: %s, LLM: %s. 返回缓存结果 (ID: %s)", query, request.searchType, request.enableLlm, cached_response.search_id)
+                # 确保search_id在返回的响应中，如果缓存中没有，则可能需要重新生成或标记
+                # 但get_cached_response_by_query_and_type应该已经处理了search_id的填充
+                return cached_response
+            else:
+                logger.debug("ℹ️  缓存未命中。查询: '%s', 类型: %s, LLM: %s. 继续执行搜索...", query, request.searchType, request.enableLlm)
+        
+        logger.debug("搜索类型: %s, 查询: %s", request.searchType, query)
+        
+        # 查询扩展
+        query_terms = await asyncio.to_thread(expand_query, query)
+        logger.debug("扩展后的搜索词: %s", query_terms)
+        
+        if request.searchType == 'hybrid':
+            return await self._hybrid_search(query, query_terms, request)
+        elif request.searchType == 'vector':
+            return await self._vector_search(query, query_terms, request)
+        else:
+            return await self._keyword_search(query, query_terms, request)
+
+    async def _hybrid_search(self, query: str, query_terms: List[str], request: SearchRequest,
+                             search_id: Optional[str] = None) -> SearchResponse:
+        """混合搜索（search_id 为异步任务预生成的缓存ID，可选）"""
         if not self.embedder:
             raise Exception("嵌入服务不可用，无法执行混合搜索")
             
-        query_embedding = self.embedder.get_embeddings(query)[0].tolist()
+        query_embedding = await self.embedding_batcher.embed(query)
         search_query = self.build_hybrid_search_query(query_terms, query_embedding, request.page, request.pageSize)
         
-        # 使用search pipeline进行归一化和权重组合
-        search_params = {"search_pipeline": "nlp-search-pipeline"}
+        # 使用search pipeline进行分数融合（归一化加权或RRF）
+        search_params = {"search_pipeline": self.hybrid_search_pipeline(), "filter_path": _SEARCH_FILTER_PATH}
         
         # 执行搜索
-        response = self.opensearch_client.search(
+        response = await self.opensearch_client.search(
             index=settings.OPENSEARCH_INDEX_NAME,
             body=search_query,
             params=search_params
@@ -434,22 +634,15 @@ JSON 结构如下：{{
         
         # 处理搜索结果
         results = []
-        for hit in response['hits']['hits']:
+        hits = response['hits'].get('hits', [])
+        unique_terms = self.dedupe_query_terms(query_terms)
+        lowered_terms = [term.lower() for term in unique_terms]
+        named_queries_supported = any('matched_queries' in hit for hit in hits)
+        for hit in hits:
             # 找出匹配的关键词
-            matched_keywords = self.find_matched_keywords(query_terms, hit['_source'])
-            
-            # 提取高亮匹配的关键词
-            highlight_matched = self.extract_matched_keywords(hit.get('highlight', {}))
+            matched_keywords = self.matched_terms_for_hit(unique_terms, hit, lowered_terms, named_queries_supported)
             
-            result = SearchResult(
-                id=hit['_source']['id'],
-                title=hit['_source']['title'],
-                keywords=hit['_source'].get('keywords', []),
-                abstract=hit['_source']['abstract'],
-                score=hit['_score'],
-                source='hybrid',
-                matched_keywords=matched_keywords + highlight_matched
-            )
+            result = self._hit_to_result(hit, 'hybrid', matched_keywords=matched_keywords)
             results.append(result)
         
         # 如果启用了rerank功能，对所有结果进行重排序
@@ -461,115 +654,93 @@ JSON 结构如下：{{
             total=response['hits']['total']['value'],
             results=results,
             searchType=request.searchType,
-            rewrittenTerms=query_terms
+            rewrittenTerms=query_terms,
+            search_id=search_id
         )
         
-        # 保存搜索结果到DynamoDB缓存
-        if self.cache:
-            search_id = self.cache.save_search_result(
-                query=query,
-                search_type=request.searchType,
-                response=search_response,
-                enable_llm=request.enableLlm
-            )
-            if search_id:
-                search_response.search_id = search_id
-        
+        await self._save_to_cache(query, request, search_response, search_id)
         return search_response
 
-    async def _vector_search(self, query: str, query_terms: List[str], request: SearchRequest) -> SearchResponse:
-        """向量搜索"""
+    async def _vector_search(self, query: str, query_terms: List[str], request: SearchRequest,
+                             search_id: Optional[str] = None) -> SearchResponse:
+        """向量搜索（search_id 为异步任务预生成的缓存ID，可选）"""
         if not self.embedder:
             raise Exception("嵌入服务不可用，无法执行向量搜索")
             
-        query_embedding = self.embedder.get_embeddings(query)[0].tolist()
+        query_embedding = await self.embedding_batcher.embed(query)
         search_query = self.build_vector_search_query(query_embedding, query_terms, request.page, request.pageSize)
         
         # 执行搜索
-        response = self.opensearch_client.search(
+        response = await self.opensearch_client.search(
             index=settings.OPENSEARCH_INDEX_NAME,
-            body=search_query
+            body=search_query,
+            params={"filter_path": _SEARCH_FILTER_PATH}
         )
+        hits = response['hits'].get('hits', [])
+        
+        # 批量进行相关性评估
+        eval_texts = [self._build_eval_text(hit['_source']) for hit in hits]
+        verdicts = await self.evaluate_relevance_batch(query, eval_texts, request.enableLlm)
         
         # 处理搜索结果
         results = []
-        for hit in response['hits']['hits']:
-            # 构建评估文本
-            eval_text = f"标题：{hit['_source']['title']}\n摘要：{hit['_source']['abstract']}"
-            
-            # 进行相关性评估
-            is_relevant, reason = self.evaluate_relevance(query, eval_text, request.enableLlm)
+        for hit, (is_relevant, reason) in zip(hits, verdicts):
             if is_relevant:
-                result = SearchResult(
-                    id=hit['_source']['id'],
-                    title=hit['_source']['title'],
-                    keywords=hit['_source'].get('keywords', []),
-                    abstract=hit['_source']['abstract'],
-                    score=hit['_score'],
-                    source='vector',
-                    relevance_reason=reason
-                )
+                result = self._hit_to_result(hit, 'vector', relevance_reason=reason)
                 results.append(result)
             else:
-                print(f"文档 {hit['_source']['id']} 被LLM评估为不相关，原因：{reason}")
+                logger.debug("文档 %s 被LLM评估为不相关，原因：%s", hit['_source']['id'], reason)
         
         # 创建搜索响应
         search_response = SearchResponse(
             total=len(results),
             results=results,
             searchType=request.searchType,
-            rewrittenTerms=query_terms
+            rewrittenTerms=query_terms,
+            search_id=search_id
         )
         
-        # 保存搜索结果到DynamoDB缓存
-        if self.cache:
-            search_id = self.cache.save_search_result(
-                query=query,
-                search_type=request.searchType,
-                response=search_response,
-                enable_llm=request.enableLlm
-            )
-            if search_id:
-                search_response.search_id = search_id
-        
+        await self._save_to_cache(query, request, search_response, search_id)
         return search_response
 
-    async def _keyword_search(self, query: str, query_terms: List[str], request: SearchRequest) -> SearchResponse:
-        """关键词搜索"""
-        search_query = self.build_keyword_search_query(query_terms, request.page, request.pageSize)
+    async def _keyword_search(self, query: str, query_terms: List[str], request: SearchRequest,
+                              search_id: Optional[str] = None) -> SearchResponse:
+        """关键词搜索（search_id 为异步任务预生成的缓存ID，可选）"""
+        search_query = self.build_keyword_search_query(query_terms, request.page, request.pageSize, request.searchAfter)
         
         # 执行搜索
-        response = self.opensearch_client.search(
+        response = await self.opensearch_client.search(
             index=settings.OPENSEARCH_INDEX_NAME,
-            body=search_query
+            body=search_query,
+            params={"filter_path": _SEARCH_FILTER_PATH}
         )
         
         # 处理搜索结果
+        hits = response['hits'].get('hits', [])
         results = []
         seen_ids = set()  # 用于记录已经召回的文档ID
+        unique_terms = self.dedupe_query_terms(query_terms)
+        lowered_terms = [term.lower() for term in unique_terms]
+        named_queries_supported = any('matched_queries' in hit for hit in hits)
         
-        for hit in response['hits']['hits']:
+        # 本页已满时返回下一页的游标
+        next_search_after = hits[-1].get('sort') if len(hits) == request.pageSize else None
+        
+        for hit in hits:
             # 找出匹配的关键词
-            matched_keywords = self.find_matched_keywords(query_terms, hit['_source'])
-            
-            # 提取高亮匹配的关键词
-            highlight_matched = self.extract_matched_keywords(hit.get('highlight', {}))
+            matched_keywords = self.matched_terms_for_hit(unique_terms, hit, lowered_terms, named_queries_supported)
             
-            result = SearchResult(
-                id=hit['_source']['id'],
-                title=hit['_source']['title'],
-                keywords=hit['_source'].get('keywords', []),
-                abstract=hit['_source']['abstract'],
-                score=hit['_score'],
-                source='keyword',
-                matched_keywords=matched_keywords + highlight_matched
-            )
+            result = self._hit_to_result(hit, 'keyword', matched_keywords=matched_keywords)
             results.append(result)
             seen_ids.add(hit['_source']['id'])
         
-        # 如果关键词搜索结果不足10000且有嵌入服务，使用向量检索补充
-        if len(results) < 10000 and self.embedder:
+        # 总数取关键词命中总数，而不是本页结果数，前端据此计算页数
+        total = response['hits']['total']['value']
+        
+        # 调用方请求深度召回时，若关键词搜索结果不足10000且有嵌入服务，使用向量检索补充
+        if request.deepRecall and len(results) < 10000 and self.embedder:
             results = await self._supplement_with_vector_search(query, query_terms, results, seen_ids, request)
+            total += len(results) - len(hits)  # 计入向量补充的结果
         
         # 如果启用了rerank功能，对所有结果进行重排序
         if settings.ENABLE_RERANK and self.reranker and results:
@@ -577,52 +748,119 @@ JSON 结构如下：{{
         
         # 创建搜索响应
         search_response = SearchResponse(
-            total=len(results),
+            total=total,
             results=results,
             searchType=request.searchType,
-            rewrittenTerms=query_terms
+            rewrittenTerms=query_terms,
+            search_id=search_id,
+            nextSearchAfter=next_search_after
         )
         
-        # 保存搜索结果到DynamoDB缓存
-        if self.cache:
-            search_id = self.cache.save_search_result(
+        await self._save_to_cache(query, request, search_response, search_id)
+        return search_response
+
+    @staticmethod
+    def _hit_to_result(hit: dict, source: str, **extra) -> SearchResult:
+        """
+        将OpenSearch命中转换为SearchResult
+        
+        数据来自自有索引且字段固定，使用model_construct跳过逐字段校验，
+        大结果集时可明显降低对象构建开销；最终响应仍由FastAPI统一序列化。
+        """
+        hit_source = hit['_source']
+        return SearchResult.model_construct(
+            id=hit_source['id'],
+            title=hit_source['title'],
+            keywords=hit_source.get('keywords', []),
+            abstract=hit_source['abstract'],
+            score=hit['_score'],
+            source=source,
+            **extra
+        )
+
+    def _build_eval_text(self, hit_source: dict) -> str:
+        """构建LLM相关性评估文本"""
+        return f"标题：{hit_source['title']}\n摘要：{hit_source['abstract']}"
+
+    async def _save_to_cache(self, query: str, request: SearchRequest, search_response: SearchResponse,
+                             search_id: Optional[str] = None):
+        """
+        保存搜索结果到S3+DynamoDB缓存，并回填search_id
+        
+        异步任务传入预生成的search_id，前端会按该ID轮询，因此直接等待保存调用返回
+        （启用CACHE_BACKGROUND_WRITES时只等待入队，结果在攒批写入后即可轮询到）；
+        同步请求则预先生成search_id并在后台写入，不阻塞响应，且同一
+        请求（与进程内缓存键相同）同时只保留一个写入任务。
+        """
+        if not self.cache:
+            return
+        
+        page_size = self._reusable_page_size(request)
+        if search_id:
+            saved_id = await self.cache.asave_search_result(
                 query=query,
                 search_type=request.searchType,
                 response=search_response,
-                enable_llm=request.enableLlm
+                enable_llm=request.enableLlm,
+                search_id=search_id,
+                page_size=page_size
             )
-            if search_id:
-                search_response.search_id = search_id
+            if saved_id:
+                search_response.search_id = saved_id
+            return
+        
+        # 与进程内缓存键一致，区分页码、每页大小、深度召回和游标，避免不同页复用同一search_id
+        write_key = self._local_cache_key(query, request)
+        inflight = self._inflight_writes.get(write_key)
+        if inflight:
+            # 相同请求的写入正在进行，复用其search_id
+            search_response.search_id = inflight[0]
+            return
         
-        return search_response
+        search_id = self.cache.generate_search_id()
+        search_response.search_id = search_id
+        task = asyncio.create_task(self.cache.asave_search_result(
+            query=query,
+            search_type=request.searchType,
+            response=search_response,
+            enable_llm=request.enableLlm,
+            search_id=search_id,
+            page_size=page_size
+        ))
+        self._inflight_writes[write_key] = (search_id, task)
+        
+        def _on_done(t: asyncio.Task):
+            if self._inflight_writes.get(write_key, (None, None))[1] is t:
+                del self._inflight_writes[write_key]
+            if t.cancelled():
+                return
+            if t.exception() or not t.result():
+                logger.error("❌ 后台缓存写入失败 - ID: %s, 错误: %s", search_id, t.exception())
+        
+        task.add_done_callback(_on_done)
 
     async def _supplement_with_vector_search(self, query: str, query_terms: List[str], 
                                            results: List[SearchResult], seen_ids: set, 
                                            request: SearchRequest) -> List[SearchResult]:
         """使用向量搜索补充关键词搜索结果"""
-        print(f"关键词搜索结果数量不足10000（当前：{len(results)}），使用向量检索补充")
+        logger.debug("关键词搜索结果数量不足10000（当前：%s），使用向量检索补充", len(results))
         remaining_size = 10000 - len(results)
         
         # 将原始查询和扩写关键词合并成一个查询
         combined_query = " ".join([query] + query_terms)
-        print(f"合并后的查询词: {combined_query}")
+        logger.debug("合并后的查询词: %s", combined_query)
         
         # 获取合并查询的向量表示
-        query_embedding = self.embedder.get_embeddings(combined_query)[0].tolist()
+        query_embedding = await self.embedding_batcher.embed(combined_query)
         
         # 构建must_not查询，排除已有结果和包含关键词的文档
-        must_not_queries = [{"terms": {"id": list(seen_ids)}}]  # 排除已有结果
-        
-        # 添加关键词匹配排除
-        for keyword in query_terms:
-            must_not_queries.extend([
-                {"match_phrase": {"title": keyword}},
-                {"match_phrase": {"keywords": keyword}},
-                {"match_phrase": {"abstract": keyword}}
-            ])
+        must_not_queries = [
+            {"terms": {"id": list(seen_ids)}},  # 排除已有结果
+            self.build_keyword_exclusion_query(query_terms)  # 添加关键词匹配排除
+        ]
         
         # 构建向量检索查询
-        vector_search_query = {
+        vector_search_query = dict(_QUERY_TEMPLATE, **{
             "size": remaining_size,
             "query": {
                 "bool": {
@@ -636,96 +874,117 @@ JSON 结构如下：{{
                     },
                     "must_not": must_not_queries
                 }
-            },
-            "_source": ["id", "title", "abstract", "keywords"]
-        }
+            }
+        })
         
         # 执行向量检索
-        vector_response = self.opensearch_client.search(
+        vector_response = await self.opensearch_client.search(
             index=settings.OPENSEARCH_INDEX_NAME,
-            body=vector_search_query
+            body=vector_search_query,
+            params={"filter_path": _SEARCH_FILTER_PATH}
         )
         
+        # 只保留未召回且分数大于0.1的结果
+        candidate_hits = [
+            hit for hit in vector_response['hits'].get('hits', [])
+            if hit['_source']['id'] not in seen_ids and hit['_score'] >= 0.1
+        ]
+        
+        # 批量进行相关性评估
+        eval_texts = [self._build_eval_text(hit['_source']) for hit in candidate_hits]
+        verdicts = await self.evaluate_relevance_batch(query, eval_texts, request.enableLlm)
+        
         # 处理向量检索结果
         vector_results = []
-        for hit in vector_response['hits']['hits']:
-            if hit['_source']['id'] not in seen_ids and hit['_score'] >= 0.1:  # 只添加分数大于0.1的结果
-                # 构建评估文本
-                eval_text = f"标题：{hit['_source']['title']}\n摘要：{hit['_source']['abstract']}"
-                
-                # 进行相关性评估
-                is_relevant, reason = self.evaluate_relevance(query, eval_text, request.enableLlm)
-                if is_relevant:
-                    result = SearchResult(
-                        id=hit['_source']['id'],
-                        title=hit['_source']['title'],
-                        keywords=hit['_source'].get('keywords', []),
-                        abstract=hit['_source']['abstract'],
-                        score=hit['_score'],
-                        source='vector',
-                        relevance_reason=reason
-                    )
-                    vector_results.append(result)
-                else:
-                    print(f"文档 {hit['_source']['id']} 被LLM评估为不相关，原因：{reason}")
-        
-        # 添加向量检索结果到最终结果中
-        results.extend(vector_results)
-        
-        print(f"向量检索结果数: {len(vector_results)}")
-        print(f"补充后的结果总数：{len(results)}")
-        
-        # 对所有结果按分数重新排序
-        results.sort(key=lambda x: x.score, reverse=True)
-        print(f"排序后的前3个结果得分: {[result.score for result in results[:3]]}")
+        for hit, (is_relevant, reason) in zip(candidate_hits, verdicts):
+            if is_relevant:
+                result = self._hit_to_result(hit, 'vector', relevance_reason=reason)
+                vector_results.append(result)
+            else:
+                logger.debug("文档 %s 被LLM评估为不相关，原因：%s", hit['_source']['id'], reason)
+        
+        logger.debug("向量检索结果数: %s", len(vector_results))
+        if not vector_results:
+            return results
+        
+        if settings.ENABLE_RERANK and self.reranker:
+            # 之后的rerank会重新排序，这里直接追加即可
+            results.extend(vector_results)
+        else:
+            # 两组结果均已按分数降序，线性归并即可得到整体有序的结果
+            results = list(heapq.merge(results, vector_results, key=lambda x: -x.score))
+            logger.debug("排序后的前3个结果得分: %s", [result.score for result in results[:3]])
         
+        logger.debug("补充后的结果总数：%s", len(results))
+        return results
+
+    async def _sort_by_score(self, results: List[SearchResult]) -> List[SearchResult]:
+        """按分数降序排序，结果较多时在线程中执行"""
+        if len(results) > _CPU_OFFLOAD_THRESHOLD:
+            return await asyncio.to_thread(sorted, results, key=lambda x: x.score, reverse=True)
+        results.sort(key=lambda x: x.score, reverse=True)
         return results
 
     async def _rerank_results(self, query: str, results: List[SearchResult]) -> List[SearchResult]:
-        """对搜索结果进行重排序"""
+        """
+        对搜索结果进行重排序
+        
+        只重排初始得分最高的 RERANK_TOP_K 条结果（其余结果保持原顺序排在后面）。
+        标题按长度排序后交给重排序器，重排序器按 RERANK_BATCH_SIZE 切块并发调用端点，
+        长度相近的标题落在同一块中可减少padding浪费。
+        """
         try:
-            # 提取所有文档的标题
-            titles = [result.title for result in results]
+            results = await self._sort_by_score(results)
+            head = results[:settings.RERANK_TOP_K]
+            tail = results[settings.RERANK_TOP_K:]
+            
+            # 提取待重排文档的标题，按长度排序
+            order = sorted(range(len(head)), key=lambda i: len(head[i].title))
             
             # 使用原始查询和标题进行rerank
-            rerank_results = self.reranker.rerank(query, titles)
+            scores = await asyncio.to_thread(self.reranker.score, query, [head[i].title for i in order])
+            
+            # 任一分块失败时保留原始排序，避免新旧分数混排
+            if scores is None:
+                logger.warning("Rerank部分批次失败，保留原始排序")
+                return results
             
             # 更新结果的得分
-            if rerank_results:
-                for i, rerank_result in enumerate(rerank_results):
-                    if i < len(results):
-                        results[i].score = rerank_result['score']
-                
-                # 根据新的得分重新排序
-                results.sort(key=lambda x: x.score, reverse=True)
-                print(f"Rerank完成，重新排序后的前3个结果得分: {[result.score for result in results[:3]]}")
+            for i, score in zip(order, scores):
+                head[i].score = score
+            
+            # 根据新的得分重新排序
+            head.sort(key=lambda x: x.score, reverse=True)
+            results = head + tail
+            logger.debug("Rerank完成，重新排序后的前3个结果得分: %s", [result.score for result in results[:3]])
         except Exception as e:
-            print(f"Rerank过程出错: {str(e)}")
+            logger.error("Rerank过程出错: %s", e)
         
         return results
 
     async def _perform_search_task(self, request: SearchRequest, search_id_for_cache: str):
         """执行实际的搜索并在后台缓存结果 (供异步API使用)"""
         try:
-            print(f"⚙️ [AsyncSearchTask: {search_id_for_cache}] 开始执行异步搜索")
+            logger.info("⚙️ [AsyncSearchTask: %s] 开始执行异步搜索", search_id_for_cache)
             
             # 检查OpenSearch是否可用
             if not self.opensearch_client:
-                print(f"❌ [AsyncSearchTask: {search_id_for_cache}] OpenSearch服务不可用，任务中止")
+                logger.error("❌ [AsyncSearchTask: %s] OpenSearch服务不可用，任务中止", search_id_for_cache)
                 if self.cache:
                     try:
-                        self.cache.table.put_item(Item={
+                        now = datetime.now(timezone.utc)
+                        await self.cache.aput_item({
                             self.cache.primary_key: search_id_for_cache,
                             'search_id': search_id_for_cache,
                             'query': request.query,
                             'search_type': request.searchType,
                             'status': 'ERROR',
                             'error_message': 'OpenSearch服务不可用',
-                            'timestamp': datetime.now(timezone.utc).isoformat(),
-                            'created_at': int(datetime.now(timezone.utc).timestamp())
+                            'timestamp': now.isoformat(),
+                            'created_at': int(now.timestamp())
                         })
                     except Exception as e_cache:
-                        print(f"❌ [AsyncSearchTask: {search_id_for_cache}] 记录错误失败: {e_cache}")
+                        logger.error("❌ [AsyncSearchTask: %s] 记录错误失败: %s", search_id_for_cache, e_cache)
                 return
 
             # URL解码
@@ -735,28 +994,29 @@ JSON 结构如下：{{
                 query = request.query
 
             if not query:
-                print(f"⚠️ [AsyncSearchTask: {search_id_for_cache}] 查询为空，任务中止")
+                logger.warning("⚠️ [AsyncSearchTask: %s] 查询为空，任务中止", search_id_for_cache)
                 return
 
             # 查询扩展
-            query_terms = expand_query(query)
-            print(f"扩展后的搜索词 (异步任务 {search_id_for_cache}): {query_terms}")
+            query_terms = await asyncio.to_thread(expand_query, query)
+            logger.debug("扩展后的搜索词 (异步任务 %s): %s", search_id_for_cache, query_terms)
             
             # 执行搜索并保存结果，使用预生成的search_id
             if request.searchType == 'hybrid':
-                search_response = await self._hybrid_search_with_id(query, query_terms, request, search_id_for_cache)
+                search_response = await self._hybrid_search(query, query_terms, request, search_id_for_cache)
             elif request.searchType == 'vector':
-                search_response = await self._vector_search_with_id(query, query_terms, request, search_id_for_cache)
+                search_response = await self._vector_search(query, query_terms, request, search_id_for_cache)
             else:
-                search_response = await self._keyword_search_with_id(query, query_terms, request, search_id_for_cache)
+                search_response = await self._keyword_search(query, query_terms, request, search_id_for_cache)
             
-            print(f"✅ [AsyncSearchTask: {search_id_for_cache}] 异步搜索任务完成")
+            logger.info("✅ [AsyncSearchTask: %s] 异步搜索任务完成", search_id_for_cache)
 
         except Exception as e:
-            print(f"❌ [AsyncSearchTask: {search_id_for_cache}] 异步搜索任务执行失败: {str(e)}")
+            logger.error("❌ [AsyncSearchTask: %s] 异步搜索任务执行失败: %s", search_id_for_cache, e)
             if self.cache:
                 try:
-                    self.cache.table.put_item(Item={
+                    now = datetime.now(timezone.utc)
+                    await self.cache.aput_item({
                         self.cache.primary_key: search_id_for_cache,
                         'search_id': search_id_for_cache,
                         'query': request.query,
@@ -764,179 +1024,22 @@ JSON 结构如下：{{
                         'enable_llm': request.enableLlm,
                         'status': 'ERROR',
                         'error_message': str(e),
-                        'timestamp': datetime.now(timezone.utc).isoformat(),
-                        'created_at': int(datetime.now(timezone.utc).timestamp())
+                        'timestamp': now.isoformat(),
+                        'created_at': int(now.timestamp())
                     })
                 except Exception as ddb_e:
-                    print(f"❌ [AsyncSearchTask: {search_id_for_cache}] 无法记录错误状态: {ddb_e}")
-
-    async def _hybrid_search_with_id(self, query: str, query_terms: List[str], request: SearchRequest, search_id: str) -> SearchResponse:
-        """混合搜索 - 异步版本，使用预生成的search_id"""
-        if not self.embedder:
-            raise Exception("嵌入服务不可用，无法执行混合搜索")
-            
-        query_embedding = self.embedder.get_embeddings(query)[0].tolist()
-        search_query = self.build_hybrid_search_query(query_terms, query_embedding, request.page, request.pageSize)
-        
-        search_params = {"search_pipeline": "nlp-search-pipeline"}
-        
-        response = self.opensearch_client.search(
-            index=settings.OPENSEARCH_INDEX_NAME,
-            body=search_query,
-            params=search_params
-        )
-        
-        results = []
-        for hit in response['hits']['hits']:
-            matched_keywords = self.find_matched_keywords(query_terms, hit['_source'])
-            highlight_matched = self.extract_matched_keywords(hit.get('highlight', {}))
-            
-            result = SearchResult(
-                id=hit['_source']['id'],
-                title=hit['_source']['title'],
-                keywords=hit['_source'].get('keywords', []),
-                abstract=hit['_source']['abstract'],
-                score=hit['_score'],
-                source='hybrid',
-                matched_keywords=matched_keywords + highlight_matched
-            )
-            results.append(result)
-        
-        if settings.ENABLE_RERANK and self.reranker and results:
-            results = await self._rerank_results(query, results)
-        
-        search_response = SearchResponse(
-            total=response['hits']['total']['value'],
-            results=results,
-            searchType=request.searchType,
-            rewrittenTerms=query_terms,
-            search_id=search_id
-        )
-        
-        # 保存搜索结果到缓存，使用预生成的search_id
-        if self.cache:
-            self.cache.save_search_result(
-                query=query,
-                search_type=request.searchType,
-                response=search_response,
-                enable_llm=request.enableLlm,
-                search_id=search_id
-            )
-        
-        return search_response
-
-    async def _vector_search_with_id(self, query: str, query_terms: List[str], request: SearchRequest, search_id: str) -> SearchResponse:
-        """向量搜索 - 异步版本，使用预生成的search_id"""
-        if not self.embedder:
-            raise Exception("嵌入服务不可用，无法执行向量搜索")
-            
-        query_embedding = self.embedder.get_embeddings(query)[0].tolist()
-        search_query = self.build_vector_search_query(query_embedding, query_terms, request.page, request.pageSize)
-        
-        response = self.opensearch_client.search(
-            index=settings.OPENSEARCH_INDEX_NAME,
-            body=search_query
-        )
-        
-        results = []
-        for hit in response['hits']['hits']:
-            eval_text = f"标题：{hit['_source']['title']}\n摘要：{hit['_source']['abstract']}"
-            is_relevant, reason = self.evaluate_relevance(query, eval_text, request.enableLlm)
-            
-            if is_relevant:
-                result = SearchResult(
-                    id=hit['_source']['id'],
-                    title=hit['_source']['title'],
-                    keywords=hit['_source'].get('keywords', []),
-                    abstract=hit['_source']['abstract'],
-                    score=hit['_score'],
-                    source='vector',
-                    relevance_reason=reason
-                )
-                results.append(result)
-        
-        search_response = SearchResponse(
-            total=len(results),
-            results=results,
-            searchType=request.searchType,
-            rewrittenTerms=query_terms,
-            search_id=search_id
-        )
-        
-        if self.cache:
-            self.cache.save_search_result(
-                query=query,
-                search_type=request.searchType,
-                response=search_response,
-                enable_llm=request.enableLlm,
-                search_id=search_id
-            )
-        
-        return search_response
-
-    async def _keyword_search_with_id(self, query: str, query_terms: List[str], request: SearchRequest, search_id: str) -> SearchResponse:
-        """关键词搜索 - 异步版本，使用预生成的search_id"""
-        search_query = self.build_keyword_search_query(query_terms, request.page, request.pageSize)
-        
-        response = self.opensearch_client.search(
-            index=settings.OPENSEARCH_INDEX_NAME,
-            body=search_query
-        )
-        
-        results = []
-        seen_ids = set()
-        
-        for hit in response['hits']['hits']:
-            matched_keywords = self.find_matched_keywords(query_terms, hit['_source'])
-            highlight_matched = self.extract_matched_keywords(hit.get('highlight', {}))
-            
-            result = SearchResult(
-                id=hit['_source']['id'],
-                title=hit['_source']['title'],
-                keywords=hit['_source'].get('keywords', []),
-                abstract=hit['_source']['abstract'],
-                score=hit['_score'],
-                source='keyword',
-                matched_keywords=matched_keywords + highlight_matched
-            )
-            results.append(result)
-            seen_ids.add(hit['_source']['id'])
-        
-        if len(results) < 10000 and self.embedder:
-            results = await self._supplement_with_vector_search(query, query_terms, results, seen_ids, request)
-        
-        if settings.ENABLE_RERANK and self.reranker and results:
-            results = await self._rerank_results(query, results)
-        
-        search_response = SearchResponse(
-            total=len(results),
-            results=results,
-            searchType=request.searchType,
-            rewrittenTerms=query_terms,
-            search_id=search_id
-        )
-        
-        if self.cache:
-            self.cache.save_search_result(
-                query=query,
-                search_type=request.searchType,
-                response=search_response,
-                enable_llm=request.enableLlm,
-                search_id=search_id
-            )
-        
-        return search_response
+                    logger.error("❌ [AsyncSearchTask: %s] 无法记录错误状态: %s", search_id_for_cache, ddb_e)
 
     async def search_async(self, request: SearchRequest, background_tasks: BackgroundTasks) -> AsyncSearchInitiatedResponse:
         """启动异步搜索任务"""
         if not self.cache:
-            print("❌ 缓存服务未初始化，无法执行异步搜索")
+            logger.error("❌ 缓存服务未初始化，无法执行异步搜索")
             raise HTTPException(status_code=503, detail="缓存服务未初始化，无法执行异步搜索")
 
         # 生成唯一的搜索ID
         search_id = self.cache.generate_search_id()
         
-        print(f"➡️ 接收到异步搜索请求. 查询: '{request.query}', 类型: {request.searchType}. 分配的任务ID: {search_id}")
+        logger.info("➡️ 接收到异步搜索请求. 查询: '%s', 类型: %s. 分配的任务ID: %s", request.query, request.searchType, search_id)
         
         background_tasks.add_task(self._perform_search_task, request, search_id)
         
@@ -945,6 +1048,41 @@ JSON 结构如下：{{
             message=f"异步搜索任务已启动。使用任务ID '{search_id}' 通过 /cache/{{search_id}} 端点轮询结果。"
         )
 
+    def start_warmup(self):
+        """在后台启动SageMaker端点预热，不阻塞服务启动"""
+        self._warmup_task = asyncio.create_task(self._warmup())
+
+    async def _warmup(self):
+        """预先调用一次嵌入和重排序端点，提前建立TLS连接"""
+        if self.embedder:
+            try:
+                await asyncio.to_thread(self.embedder.get_embeddings, "warmup")
+                logger.info("✅ 嵌入服务预热完成")
+            except Exception as e:
+                logger.warning("⚠️  嵌入服务预热失败: %s", e)
+        if self.reranker:
+            try:
+                await asyncio.to_thread(self.reranker.score, "warmup", ["warmup"])
+                logger.info("✅ 重排序服务预热完成")
+            except Exception as e:
+                logger.warning("⚠️  重排序服务预热失败: %s", e)
+
+    async def close(self):
+        """释放异步客户端持有的连接"""
+        if self._warmup_task and not self._warmup_task.done():
+            self._warmup_task.cancel()
+        # 等待后台缓存写入完成，避免关闭时丢失结果
+        if self._inflight_writes:
+            await asyncio.gather(*[task for _, task in self._inflight_writes.values()], return_exceptions=True)
+        if self.cache:
+            await self.cache.aflush()
+        if self.embedding_batcher:
+            await self.embedding_batcher.close()
+        if self.opensearch_client:
+            await self.opensearch_client.close()
+        if _llm_client is not None:
+            await _llm_client.close()
+
     def get_service_status(self) -> dict:
         """获取服务状态"""
         cache_type = "none"
@@ -988,6 +1126,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 大结果集响应启用gzip压缩
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
+@app.on_event("startup")
+async def startup_event():
+    """服务启动时准备search pipeline，并在后台预热SageMaker连接"""
+    await search_engine.ensure_rrf_pipeline()
+    search_engine.start_warmup()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """关闭服务时释放连接"""
+    await search_engine.close()
+
 # ================================
 # API端点
 # ================================
@@ -1029,7 +1181,7 @@ async def get_cached_search(search_id: str):
     if not search_engine.cache:
         return {"error": "缓存未初始化"}
     
-    result = search_engine.cache.get_search_result(search_id)
+    result = await search_engine.cache.aget_search_result(search_id)
     if result:
         return result
     else:
@@ -1043,9 +1195,9 @@ async def get_cached_search_metadata(search_id: str):
     
     # 检查是否有get_search_metadata方法（S3Cache有，DynamoDBCache没有）
     if hasattr(search_engine.cache, 'get_search_metadata'):
-        result = search_engine.cache.get_search_metadata(search_id)
+        result = await search_engine.cache.aget_search_metadata(search_id)
     else:
-        result = search_engine.cache.get_search_result(search_id)
+        result = await search_engine.cache.aget_search_result(search_id)
     
     if result:
         return result
@@ -1058,7 +1210,7 @@ async def get_cache_stats():
     if not search_engine.cache:
         return {"error": "缓存未初始化"}
     
-    return search_engine.cache.get_cache_stats()
+    return await search_engine.cache.aget_cache_stats()
 
 @app.delete("/cache/{search_id}")
 async def delete_cached_search(search_id: str):
@@ -1066,7 +1218,9 @@ async def delete_cached_search(search_id: str):
     if not search_engine.cache:
         return {"error": "缓存未初始化"}
     
-    success = search_engine.cache.delete_search_result(search_id)
+    success = await search_engine.cache.adelete_search_result(search_id)
+    # 无论远端删除是否成功，都不再从进程内缓存返回该结果
+    search_engine.invalidate_local_cache(search_id)
     if success:
         return {"message": f"搜索结果已删除: {search_id}"}
     else:
@@ -1080,7 +1234,7 @@ async def get_search_history(limit: int = 50):
     
     try:
         # 使用DynamoDB scan来获取所有搜索记录
-        response = search_engine.cache.table.scan(
+        response = await search_engine.cache.ascan(
             Limit=limit,
             ProjectionExpression="search_id, #q, search_type, enable_llm, total_results, results_count, #ts, created_at",
             ExpressionAttributeNames={
@@ -1112,7 +1266,7 @@ async def get_search_history(limit: int = 50):
         return {"history": history, "count": len(history)}
         
     except Exception as e:
-        print(f"❌ 获取搜索历史失败: {e}")
+        logger.error("❌ 获取搜索历史失败: %s", e)
         return {"error": f"获取搜索历史失败: {str(e)}"}
 
 if __name__ == "__main__":
@@ -36,8 +36,12 @@ def setup_optimal_config():
     # 测试初始化
     print("\n🧪 测试缓存初始化...")
     try:
-        from utils.s3_cache import S3Cache
-        cache = S3Cache()
+        from utils.search_cache import SearchCache
+        cache = SearchCache(
+            bucket_name=settings.S3_BUCKET_NAME,
+            table_name=settings.DYNAMODB_TABLE_NAME,
+            region_name=settings.DYNAMODB_REGION
+        )
         print(f"   S3客户端: {'✅' if cache.s3_client else '❌'}")
         print(f"   DynamoDB表: {'✅' if cache.table else '❌'}")
         print(f"   检测到的主键: {cache.primary_key}")
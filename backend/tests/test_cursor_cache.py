@@ -0,0 +1,141 @@
+"""
+游标分页与S3+DynamoDB缓存的交互测试
+"""
+
+import asyncio
+
+from cachetools import TTLCache
+
+import main
+from main import AsyncPaperSearch
+from utils.models import SearchRequest, SearchResponse
+
+
+class FakeCache:
+    """记录调用的S3+DynamoDB缓存替身"""
+
+    def __init__(self):
+        self.lookups = []
+        self.saves = []
+        self.generated = 0
+
+    def generate_search_id(self):
+        self.generated += 1
+        return f"sid-{self.generated}"
+
+    async def aget_cached_response_by_query_and_type(self, **kwargs):
+        self.lookups.append(kwargs)
+        return None
+
+    async def asave_search_result(self, **kwargs):
+        self.saves.append(kwargs)
+        return kwargs['search_id']
+
+
+class FakeOpenSearch:
+    """返回固定命中的OpenSearch替身"""
+
+    def __init__(self, hits, total=None):
+        self.hits = hits
+        self.total = len(hits) if total is None else total
+        self.bodies = []
+
+    async def search(self, index, body, params=None):
+        self.bodies.append(body)
+        return {'hits': {'total': {'value': self.total, 'relation': 'eq'}, 'hits': self.hits}}
+
+
+def _hit(doc_id, score):
+    return {
+        '_source': {'id': doc_id, 'title': f"title {doc_id}", 'abstract': "abstract", 'keywords': []},
+        '_score': score,
+        'sort': [score, doc_id]
+    }
+
+
+def _make_engine(hits, total=None):
+    engine = AsyncPaperSearch.__new__(AsyncPaperSearch)
+    engine.opensearch_client = FakeOpenSearch(hits, total)
+    engine.embedder = None
+    engine.embedding_batcher = None
+    engine.reranker = None
+    engine.cache = FakeCache()
+    engine._inflight_writes = {}
+    engine._local_cache = TTLCache(maxsize=16, ttl=300)
+    engine._local_cache_locks = {}
+    engine._local_cache_ids = TTLCache(maxsize=16, ttl=300)
+    return engine
+
+
+async def _search_and_drain(engine, request):
+    response = await engine._run_search(request.query, request)
+    # 等待后台缓存写入完成
+    await asyncio.gather(*[task for _, task in list(engine._inflight_writes.values())])
+    return response
+
+
+def test_cursor_request_skips_query_cache_lookup(monkeypatch):
+    monkeypatch.setattr(main, 'expand_query', lambda query: [query])
+    engine = _make_engine([_hit('a', 2.0), _hit('b', 1.0)])
+    request = SearchRequest(query="graph neural network", pageSize=2, searchAfter=[3.0, 'z'])
+
+    response = asyncio.run(_search_and_drain(engine, request))
+
+    assert engine.cache.lookups == []
+    assert response.nextSearchAfter == [1.0, 'b']
+    # 游标页仍会写入缓存供按search_id读取，但不记录page_size，不会被按查询文本复用
+    assert len(engine.cache.saves) == 1
+    assert engine.cache.saves[0]['page_size'] is None
+
+
+def test_deep_recall_and_later_pages_skip_query_cache_lookup(monkeypatch):
+    monkeypatch.setattr(main, 'expand_query', lambda query: [query])
+    for request in (SearchRequest(query="transformer", deepRecall=True),
+                    SearchRequest(query="transformer", page=2)):
+        engine = _make_engine([_hit('a', 1.0)])
+        asyncio.run(_search_and_drain(engine, request))
+        assert engine.cache.lookups == []
+        assert engine.cache.saves[0]['page_size'] is None
+
+
+def test_first_page_uses_query_cache_with_page_size(monkeypatch):
+    monkeypatch.setattr(main, 'expand_query', lambda query: [query])
+    engine = _make_engine([_hit('a', 2.0), _hit('b', 1.0)])
+    request = SearchRequest(query="transformer", pageSize=2)
+
+    asyncio.run(_search_and_drain(engine, request))
+
+    assert engine.cache.lookups[0]['page_size'] == 2
+    assert engine.cache.saves[0]['page_size'] == 2
+    assert engine.cache.saves[0]['response'].nextSearchAfter == [1.0, 'b']
+
+
+def test_keyword_total_counts_all_hits_not_page(monkeypatch):
+    monkeypatch.setattr(main, 'expand_query', lambda query: [query])
+    engine = _make_engine([_hit('a', 2.0), _hit('b', 1.0)], total=120)
+    request = SearchRequest(query="transformer", pageSize=2)
+
+    response = asyncio.run(_search_and_drain(engine, request))
+
+    assert len(response.results) == 2
+    assert response.total == 120
+
+
+def test_concurrent_writes_for_different_pages_get_own_search_ids():
+    engine = _make_engine([])
+    first = SearchRequest(query="transformer")
+    cursor = SearchRequest(query="transformer", searchAfter=[1.0, 'b'])
+
+    async def save_both():
+        first_response = SearchResponse(total=0, results=[], searchType='keyword')
+        cursor_response = SearchResponse(total=0, results=[], searchType='keyword')
+        # 第一页的后台写入尚未完成时保存游标页
+        await engine._save_to_cache(first.query, first, first_response)
+        await engine._save_to_cache(cursor.query, cursor, cursor_response)
+        await asyncio.gather(*[task for _, task in list(engine._inflight_writes.values())])
+        return first_response, cursor_response
+
+    first_response, cursor_response = asyncio.run(save_both())
+
+    assert first_response.search_id != cursor_response.search_id
+    assert len(engine.cache.saves) == 2
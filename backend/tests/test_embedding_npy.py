@@ -0,0 +1,70 @@
+"""
+嵌入端点二进制输出回退测试
+"""
+
+import numpy as np
+import orjson
+import pytest
+from botocore.exceptions import ClientError
+
+from utils.embedding import BGEM3Embedder
+
+
+class FakeBody:
+    def __init__(self, data: bytes):
+        self.data = data
+
+    def read(self):
+        return self.data
+
+
+class FakeSageMakerClient:
+    """首次npy请求抛出给定错误，之后返回JSON嵌入"""
+
+    def __init__(self, error: ClientError):
+        self.error = error
+        self.accepts = []
+
+    def invoke_endpoint(self, **kwargs):
+        self.accepts.append(kwargs.get('Accept'))
+        if kwargs.get('Accept') == 'application/x-npy' and self.error:
+            error, self.error = self.error, None
+            raise error
+        body = orjson.dumps({'data': [{'embedding': [0.1, 0.2]}]})
+        return {'Body': FakeBody(body), 'ContentType': 'application/json'}
+
+
+def _make_embedder(error: ClientError) -> BGEM3Embedder:
+    embedder = BGEM3Embedder.__new__(BGEM3Embedder)
+    embedder.endpoint_name = "bge-m3"
+    embedder.max_workers = 1
+    embedder.accept_npy = True
+    embedder.dtype = np.dtype('float32')
+    embedder.client = FakeSageMakerClient(error)
+    return embedder
+
+
+def _client_error(code: str, message: str, **extra) -> ClientError:
+    return ClientError({'Error': {'Code': code, 'Message': message}, **extra}, 'InvokeEndpoint')
+
+
+def test_unsupported_accept_falls_back_to_json():
+    embedder = _make_embedder(_client_error(
+        'ModelError', 'Received client error (415) from primary', OriginalStatusCode=415))
+
+    embeddings = embedder._invoke_batch(["text"])
+
+    assert embeddings.shape == (1, 2)
+    assert embedder.accept_npy is False
+    assert embedder.client.accepts == ['application/x-npy', None]
+
+
+def test_transient_error_keeps_npy_enabled():
+    embedder = _make_embedder(_client_error('ThrottlingException', 'Rate exceeded'))
+
+    with pytest.raises(ClientError):
+        embedder._invoke_batch(["text"])
+
+    assert embedder.accept_npy is True
+    assert embedder._invoke_batch(["text"]).shape == (1, 2)
+    assert embedder.client.accepts == ['application/x-npy', 'application/x-npy']
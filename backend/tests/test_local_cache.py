@@ -0,0 +1,30 @@
+"""
+进程内缓存失效测试
+"""
+
+import asyncio
+
+import main
+from utils.models import SearchRequest
+
+from test_cursor_cache import _hit, _make_engine
+
+
+def test_deleted_search_id_is_dropped_from_local_cache(monkeypatch):
+    monkeypatch.setattr(main, 'expand_query', lambda query: [query])
+    engine = _make_engine([_hit('a', 1.0)])
+    request = SearchRequest(query="transformer")
+
+    async def run():
+        first = await engine.search(request)
+        cached = await engine.search(request)
+        engine.invalidate_local_cache(first.search_id)
+        fresh = await engine.search(request)
+        return first, cached, fresh
+
+    first, cached, fresh = asyncio.run(run())
+
+    assert cached is first
+    assert fresh is not first
+    assert fresh.search_id != first.search_id
+    assert len(engine.opensearch_client.bodies) == 2
@@ -0,0 +1,66 @@
+"""
+AWS客户端共享模块 - 进程内复用同一个boto3 Session及各服务客户端
+
+boto3.client/resource 每次创建都要解析凭证、加载服务模型并新建连接池，
+开销远大于一次普通调用，因此同一服务与区域只创建一次并全局复用。
+"""
+
+import os
+import threading
+from functools import lru_cache
+from typing import Optional
+
+import boto3
+from botocore.config import Config
+
+# 通用配置（S3、DynamoDB）：连接池复用TCP/TLS连接，自适应重试应对限流；
+# 超时比botocore默认的60秒短，连接卡住时尽快重试而不是占住请求线程
+DEFAULT_CONFIG = Config(
+    max_pool_connections=int(os.getenv('AWS_MAX_POOL_CONNECTIONS', '64')),
+    connect_timeout=float(os.getenv('AWS_CONNECT_TIMEOUT', '3')),
+    read_timeout=float(os.getenv('AWS_READ_TIMEOUT', '20')),
+    retries={'mode': 'adaptive', 'max_attempts': 10},
+    tcp_keepalive=True
+)
+
+# SageMaker推理调用：在线请求路径上失败要尽快返回，重试次数和超时比通用配置更短，可通过环境变量调整
+SAGEMAKER_CONFIG = Config(
+    max_pool_connections=int(os.getenv('SAGEMAKER_MAX_POOL_CONNECTIONS', '64')),
+    connect_timeout=float(os.getenv('SAGEMAKER_CONNECT_TIMEOUT', '3')),
+    read_timeout=float(os.getenv('SAGEMAKER_READ_TIMEOUT', '10')),
+    retries={'mode': 'adaptive', 'max_attempts': int(os.getenv('SAGEMAKER_MAX_ATTEMPTS', '3'))},
+    tcp_keepalive=True
+)
+
+_session: Optional[boto3.session.Session] = None
+# boto3 Session创建客户端不是线程安全的，创建过程需要加锁（创建好的客户端可跨线程使用）
+_lock = threading.Lock()
+
+
+def get_session() -> boto3.session.Session:
+    """获取进程共享的boto3 Session"""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = boto3.session.Session(
+                    aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+                    aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
+                )
+    return _session
+
+
+@lru_cache(maxsize=None)
+def get_client(service_name: str, region_name: str, config: Config = DEFAULT_CONFIG):
+    """获取共享的低级客户端（按服务、区域和配置缓存）"""
+    session = get_session()
+    with _lock:
+        return session.client(service_name, region_name=region_name, config=config)
+
+
+@lru_cache(maxsize=None)
+def get_resource(service_name: str, region_name: str, config: Config = DEFAULT_CONFIG):
+    """获取共享的资源对象（按服务、区域和配置缓存）"""
+    session = get_session()
+    with _lock:
+        return session.resource(service_name, region_name=region_name, config=config)
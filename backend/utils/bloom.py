@@ -0,0 +1,53 @@
+"""
+布隆过滤器模块 - 用于快速判断search_id是否一定不存在
+
+只会误判"可能存在"，不会漏判：判断为不存在的ID无需再查询DynamoDB。
+"""
+
+import math
+import hashlib
+import threading
+
+
+class BloomFilter:
+    """固定容量的线程安全布隆过滤器"""
+
+    def __init__(self, capacity: int, error_rate: float = 1e-4):
+        """
+        初始化布隆过滤器
+
+        Args:
+            capacity: 预计元素数量，超过后误判率上升
+            error_rate: 目标误判率
+        """
+        if capacity <= 0:
+            raise ValueError("capacity必须大于0")
+        if not 0 < error_rate < 1:
+            raise ValueError("error_rate必须在0和1之间")
+
+        # 位数 m = -n·ln(p) / (ln2)^2，哈希函数个数 k = m/n·ln2
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def _positions(self, key: str):
+        """双重哈希：由一次blake2b摘要的两半生成k个位置"""
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, key: str):
+        """加入一个元素"""
+        positions = self._positions(key)
+        with self._lock:
+            for pos in positions:
+                self._bits[pos >> 3] |= 1 << (pos & 7)
+            self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        """元素可能存在时返回True，一定不存在时返回False"""
+        bits = self._bits
+        return all(bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
@@ -1,29 +1,63 @@
-import json
-import boto3
+import io
+import asyncio
+import orjson
 import numpy as np
-from typing import List, Union
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Optional, Tuple, Union
 import os
+import logging
+from botocore.exceptions import ClientError
+from .aws import SAGEMAKER_CONFIG, get_client
+
+logger = logging.getLogger(__name__)
+
+# 端点因不支持所请求的输出格式而拒绝请求时，容器返回的HTTP状态码
+_UNSUPPORTED_ACCEPT_STATUS = (406, 415)
+
+
+def _is_unsupported_accept(error: ClientError) -> bool:
+    """
+    判断ClientError是否表示端点拒绝了 application/x-npy 输出格式
+    
+    限流、超时等临时错误不属于此类，不应因此永久关闭二进制输出
+    """
+    err = error.response.get('Error', {})
+    code = err.get('Code')
+    message = err.get('Message', '').lower()
+    if code == 'ValidationError':
+        return 'accept' in message or 'x-npy' in message
+    if code == 'ModelError':
+        status = error.response.get('OriginalStatusCode')
+        return status in _UNSUPPORTED_ACCEPT_STATUS or 'accept' in message or 'x-npy' in message
+    return False
+
 
 class BGEM3Embedder:
-    def __init__(self, endpoint_name: str):
+    def __init__(self, endpoint_name: str, max_workers: int = 8, accept_npy: bool = False,
+                 dtype: str = "float32"):
         """
         初始化BGE-M3 Embedder
         
         Args:
             endpoint_name: SageMaker端点名称
+            max_workers: 多批文本时并发调用端点的最大线程数
+            accept_npy: 是否请求 application/x-npy 二进制输出（端点需支持，
+                不支持时自动回退到JSON）
+            dtype: 返回的embedding精度，float32（默认）或float16（内存减半）
         """
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"不支持的embedding精度: {dtype}")
+        self.dtype = np.dtype(dtype)
         self.endpoint_name = endpoint_name
+        self.max_workers = max_workers
+        self.accept_npy = accept_npy
         # 配置 AWS 客户端
         aws_region = os.getenv('AWS_REGION')
         if not aws_region:
             raise ValueError("Missing AWS_REGION environment variable")
             
-        self.client = boto3.client(
-            'sagemaker-runtime',
-            region_name=aws_region,
-            aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
-            aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY')
-        )
+        # 复用进程共享的客户端（凭证取自 AWS_ACCESS_KEY_ID / AWS_SECRET_ACCESS_KEY）
+        self.client = get_client('sagemaker-runtime', aws_region, SAGEMAKER_CONFIG)
         
     def get_embeddings(self, texts: Union[str, List[str]], batch_size: int = 32) -> np.ndarray:
         """
@@ -34,42 +68,171 @@ class BGEM3Embedder:
             batch_size: 批处理大小，默认32
             
         Returns:
-            numpy数组形式的embeddings
+            numpy数组形式的embeddings（精度为self.dtype，形状为 (文本数, 维度)）
         """
         if isinstance(texts, str):
             texts = [texts]
         
-        all_embeddings = []
+        # 结果矩阵在拿到第一批维度后一次性分配，逐批写入对应切片
+        final_embeddings: Optional[np.ndarray] = None
+        
+        def fill(start: int, batch_embeddings: np.ndarray):
+            nonlocal final_embeddings
+            if final_embeddings is None:
+                final_embeddings = np.empty((len(texts), batch_embeddings.shape[1]), dtype=self.dtype)
+            final_embeddings[start:start + len(batch_embeddings)] = batch_embeddings
         
-        # 批量处理
-        for i in range(0, len(texts), batch_size):
-            batch_texts = texts[i:i + batch_size]
+        starts = range(0, len(texts), batch_size)
+        if len(starts) <= 1 or self.max_workers <= 1:
+            # 单批时直接在当前线程调用
+            for i in starts:
+                fill(i, self._invoke_batch(texts[i:i + batch_size]))
+        else:
+            # 多批时并发调用端点，各批结果按起始位置写回
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(starts))) as pool:
+                futures = {pool.submit(self._invoke_batch, texts[i:i + batch_size]): i for i in starts}
+                for future in as_completed(futures):
+                    fill(futures[future], future.result())
+        
+        if final_embeddings is None:
+            return np.empty((0, 0), dtype=self.dtype)
+        return final_embeddings
+    
+    def _invoke_batch(self, batch_texts: List[str]) -> np.ndarray:
+        """
+        调用一次SageMaker端点获取一批文本的embeddings
+        
+        Args:
+            batch_texts: 本批文本
             
-            # 准备输入数据
-            payload = {
-                "input": batch_texts
-            }
+        Returns:
+            精度为self.dtype的numpy数组，形状为 (本批文本数, 维度)
+        """
+        # 准备输入数据
+        payload = {
+            "input": batch_texts
+        }
+        
+        body = orjson.dumps(payload)
+        
+        if self.accept_npy:
+            try:
+                response = self.client.invoke_endpoint(
+                    EndpointName=self.endpoint_name,
+                    ContentType='application/json',
+                    Accept='application/x-npy',
+                    Body=body
+                )
+            except ClientError as e:
+                # 仅在端点明确拒绝二进制输出时，之后的调用都改回JSON；其他错误照常抛出
+                if not _is_unsupported_accept(e):
+                    raise
+                logger.warning("⚠️  端点不支持application/x-npy输出，回退到JSON: %s", e)
+                self.accept_npy = False
+            else:
+                raw_body = response['Body'].read()
+                if response.get('ContentType') == 'application/x-npy':
+                    # 二进制输出：每个float只占4字节，无需JSON解析
+                    return np.load(io.BytesIO(raw_body)).astype(self.dtype, copy=False)
+                return self._parse_json_embeddings(raw_body)
+        
+        # 调用SageMaker端点
+        response = self.client.invoke_endpoint(
+            EndpointName=self.endpoint_name,
+            ContentType='application/json',
+            Body=body
+        )
+        return self._parse_json_embeddings(response['Body'].read())
+    
+    def _parse_json_embeddings(self, raw_body: bytes) -> np.ndarray:
+        """解析JSON格式的embedding响应为self.dtype精度的矩阵"""
+        # orjson直接解析bytes，无需先解码；只保留data部分
+        data = orjson.loads(raw_body)['data']
+        del raw_body
+        
+        # 获取embeddings数据，直接转换为目标精度的矩阵
+        return np.asarray([emb['embedding'] for emb in data], dtype=self.dtype)
+    
+    def get_embeddings_batch(self, texts: List[str]) -> np.ndarray:
+        """
+        在一次SageMaker调用中获取一批文本的embeddings
+        
+        Args:
+            texts: 文本列表
             
-            # 调用SageMaker端点
-            response = self.client.invoke_endpoint(
-                EndpointName=self.endpoint_name,
-                ContentType='application/json',
-                Body=json.dumps(payload)
-            )
+        Returns:
+            numpy数组形式的embeddings
+        """
+        return self.get_embeddings(texts, batch_size=max(1, len(texts)))
+
+class AsyncEmbeddingBatcher:
+    """将并发到达的单条文本嵌入请求合并为一次批量SageMaker调用"""
+    
+    def __init__(self, embedder: BGEM3Embedder, max_batch: int = 16, max_wait_ms: float = 8):
+        """
+        初始化嵌入微批处理器
+        
+        Args:
+            embedder: BGE-M3 Embedder实例
+            max_batch: 单次调用的最大文本数
+            max_wait_ms: 凑批的最长等待时间（毫秒）
+        """
+        self.embedder = embedder
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        # 队列和消费任务在首次使用时于运行中的事件循环内创建
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+    
+    async def embed(self, text: str) -> List[float]:
+        """
+        获取单条文本的embedding
+        
+        Args:
+            text: 文本
             
-            # 解析响应
-            response_body = json.loads(response['Body'].read().decode())
-            #print("响应内容：", json.dumps(response_body, indent=2, ensure_ascii=False))
+        Returns:
+            embedding列表（精度由embedder的dtype决定）
+        """
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._consume())
+        
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((text, future))
+        return await future
+    
+    async def _consume(self):
+        """后台消费队列：凑满max_batch或等待max_wait后发起一次批量调用"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch: List[Tuple[str, asyncio.Future]] = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
             
-            # 获取embeddings数据
-            embeddings = response_body['data']
-            # 将每个embedding从字典转换为列表
-            embeddings = [emb['embedding'] for emb in embeddings]
-            all_embeddings.extend(embeddings)
-        
-        # 将所有embedding转换为numpy数组
-        final_embeddings = np.array(all_embeddings)
-        return final_embeddings
+            texts = [text for text, _ in batch]
+            try:
+                embeddings = await asyncio.to_thread(self.embedder.get_embeddings_batch, texts)
+                for (_, future), embedding in zip(batch, embeddings):
+                    if not future.done():
+                        future.set_result(embedding.tolist())
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+    
+    async def close(self):
+        """停止后台消费任务"""
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
 
 def main():
     # 使用示例
@@ -2,7 +2,7 @@
 Async FastAPI 数据模型模块
 """
 
-from typing import List, Optional
+from typing import Any, List, Optional
 from pydantic import BaseModel, Field
 
 class SearchRequest(BaseModel):
@@ -12,6 +12,8 @@ class SearchRequest(BaseModel):
     pageSize: int = Field(30, description="每页结果数", ge=1, le=10000)
     searchType: str = Field("keyword", description="搜索类型")
     enableLlm: bool = Field(False, description="是否启用LLM相关性评估")
+    deepRecall: bool = Field(False, description="关键词搜索结果不足时是否使用向量检索补充")
+    searchAfter: Optional[List[Any]] = Field(None, description="关键词搜索的search_after游标（取自上一页的nextSearchAfter）")
 
 class SearchResult(BaseModel):
     """搜索结果项模型"""
@@ -31,6 +33,7 @@ class SearchResponse(BaseModel):
     searchType: str = Field(..., description="搜索类型")
     rewrittenTerms: Optional[List[str]] = Field(None, description="重写的搜索词")
     search_id: Optional[str] = Field(None, description="搜索缓存ID")
+    nextSearchAfter: Optional[List[Any]] = Field(None, description="关键词搜索下一页的search_after游标")
 
 class AsyncSearchInitiatedResponse(BaseModel):
     """异步搜索启动响应模型"""
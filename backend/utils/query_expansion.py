@@ -6,9 +6,13 @@ Async FastAPI 查询扩展模块
 import os
 import json
 import re
+import hashlib
 import logging
+import threading
 from typing import List
 import openai
+from cachetools import LRUCache
+from diskcache import Cache
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -21,6 +25,47 @@ logger = logging.getLogger(__name__)
 openai.api_key = os.getenv("OPENAI_API_KEY", "")
 openai.api_base = os.getenv("OPENAI_API_BASE", "http://127.0.0.1:8000/v1")
 
+# 预编译的正则表达式
+_JSON_TAG_RE = re.compile(r'<json>(.*?)</json>', re.DOTALL)  # <json>标签中的内容
+_JSON_OBJ_RE = re.compile(r'\{.*\}', re.DOTALL)  # 最外层的JSON对象
+
+# OpenAI客户端在首次使用时创建一次，之后复用其连接池
+_client: "openai.OpenAI | None" = None
+_client_lock = threading.Lock()
+
+def _get_client() -> openai.OpenAI:
+    """获取共享的OpenAI客户端（线程安全的延迟初始化）"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = openai.OpenAI(api_key=openai.api_key, base_url=openai.api_base)
+    return _client
+
+# 查询扩展结果缓存（进程内LRU，按规范化后的查询缓存，只缓存扩展成功的结果）
+_EXPANSION_CACHE_MAXSIZE = int(os.getenv("QUERY_EXPANSION_CACHE_MAXSIZE", "4096"))
+_expansion_cache: LRUCache = LRUCache(maxsize=_EXPANSION_CACHE_MAXSIZE)
+_expansion_cache_lock = threading.Lock()
+
+# 查询重写结果的磁盘缓存：进程重启或多个worker之间共享，按查询的sha256作为键
+_REWRITE_CACHE_DIR = os.getenv("QUERY_REWRITE_CACHE_DIR", "/tmp/query_rewrite_cache")
+_REWRITE_CACHE_EXPIRE = 7 * 24 * 60 * 60  # 7天
+_rewrite_disk_cache: "Cache | None" = None
+_rewrite_disk_cache_failed = False
+
+def _get_rewrite_disk_cache() -> "Cache | None":
+    """获取查询重写磁盘缓存，目录不可用时返回None（只尝试初始化一次）"""
+    global _rewrite_disk_cache, _rewrite_disk_cache_failed
+    if _rewrite_disk_cache is None and not _rewrite_disk_cache_failed:
+        with _client_lock:
+            if _rewrite_disk_cache is None and not _rewrite_disk_cache_failed:
+                try:
+                    _rewrite_disk_cache = Cache(_REWRITE_CACHE_DIR, size_limit=1 << 30)
+                except Exception as e:
+                    logger.warning(f"查询重写磁盘缓存不可用，跳过磁盘缓存: {e}")
+                    _rewrite_disk_cache_failed = True
+    return _rewrite_disk_cache
+
 # 定义 prompt 模板
 QUERY_REWRITE_PROMPT = """
 # 医学术语处理与多语言专业扩展规则
@@ -102,13 +147,21 @@ def rewrite_query(query: str) -> str:
         logger.warning("未配置OpenAI API密钥，跳过查询重写")
         return query
         
+    # 先查磁盘缓存
+    disk_cache = _get_rewrite_disk_cache()
+    disk_key = hashlib.sha256(query.encode('utf-8')).hexdigest()
+    if disk_cache is not None:
+        cached = disk_cache.get(disk_key)
+        if cached is not None:
+            logger.info(f"Query rewrite 命中磁盘缓存: '{query}'")
+            return cached
+    
     prompt = QUERY_REWRITE_PROMPT.format(query=query)
     logger.info(f"执行 query rewrite, 原始查询: '{query}'")
     
     try:
-        # 使用新的 client API 调用
-        client = openai.OpenAI(api_key=openai.api_key, base_url=openai.api_base)
-        response = client.chat.completions.create(
+        # 使用共享的 client 调用
+        response = _get_client().chat.completions.create(
             model="Qwen2.5-72B-Instruct-AWQ",
             messages=[
                 {"role": "system", "content": "你是一名专业的医学信息标准化专家。请严格按照要求返回JSON格式的结果，并将结果放在<json>标签中。"},
@@ -122,7 +175,7 @@ def rewrite_query(query: str) -> str:
         # 检查结果是否包含<json>标签
         if "<json>" not in result:
             # 尝试提取JSON内容并添加标签
-            json_match = re.search(r'\{.*\}', result, re.DOTALL)
+            json_match = _JSON_OBJ_RE.search(result)
             if json_match:
                 json_content = json_match.group(0)
                 try:
@@ -137,6 +190,11 @@ def rewrite_query(query: str) -> str:
                 return query
             
         logger.info(f"Query rewrite 完成: {result}")
+        if disk_cache is not None:
+            try:
+                disk_cache.set(disk_key, result, expire=_REWRITE_CACHE_EXPIRE)
+            except Exception as e:
+                logger.warning(f"写入查询重写磁盘缓存失败: {e}")
         return result
     except Exception as e:
         logger.error(f"调用 OpenAI API 出错: {e}")
@@ -154,13 +212,11 @@ def extract_terms_from_rewrite(rewritten_query: str) -> List[str]:
     search_terms = []
     
     try:
-        start_idx = rewritten_query.find('<json>')
-        end_idx = rewritten_query.find('</json>')
-        
-        if start_idx == -1 or end_idx == -1:
+        match = _JSON_TAG_RE.search(rewritten_query)
+        if not match:
             return [rewritten_query.strip()]
         
-        json_str = rewritten_query[start_idx + 6:end_idx].strip()
+        json_str = match.group(1).strip()
         data = json.loads(json_str)
         
         # 添加原始查询
@@ -194,15 +250,28 @@ def extract_terms_from_rewrite(rewritten_query: str) -> List[str]:
     
     return search_terms if search_terms else [rewritten_query.strip()]
 
+def _normalize_query(query: str) -> str:
+    """规范化查询作为缓存键：去除首尾空白、合并连续空白并转为小写"""
+    return " ".join(query.split()).lower()
+
 def expand_query(query: str) -> List[str]:
     """
     完整的查询扩展流程：重写查询并提取术语
     
+    相同查询（忽略大小写与多余空白）命中缓存时直接返回，不再调用LLM。
+    
     Args:
         query: 原始查询
     Returns:
         扩展后的搜索词列表
     """
+    cache_key = _normalize_query(query)
+    with _expansion_cache_lock:
+        cached = _expansion_cache.get(cache_key)
+    if cached is not None:
+        logger.info(f"查询扩展命中缓存: '{query}'")
+        return list(cached)
+    
     # 重写查询
     rewritten_query = rewrite_query(query)
     
@@ -210,6 +279,11 @@ def expand_query(query: str) -> List[str]:
     expanded_terms = extract_terms_from_rewrite(rewritten_query)
     
     logger.info(f"查询扩展完成: '{query}' -> {expanded_terms}")
+    
+    # 重写失败时只会返回原始查询，不缓存以便下次重试
+    if len(expanded_terms) > 1:
+        with _expansion_cache_lock:
+            _expansion_cache[cache_key] = tuple(expanded_terms)
     return expanded_terms
 
 if __name__ == '__main__':
@@ -1,30 +1,61 @@
-import json
-import boto3
+import orjson
 import numpy as np
 import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from .aws import SAGEMAKER_CONFIG, get_client
+
+logger = logging.getLogger(__name__)
 
 class BGEReranker:
-    def __init__(self, endpoint_name):
+    def __init__(self, endpoint_name, chunk_size=32, max_workers=8):
+        """
+        初始化BGE Reranker
+        
+        Args:
+            endpoint_name (str): SageMaker端点名称
+            chunk_size (int): 单次端点调用的最大段落数
+            max_workers (int): 多个分块并发调用端点的最大线程数
+        """
         self.endpoint_name = endpoint_name
+        self.chunk_size = max(1, chunk_size)
+        self.max_workers = max_workers
         # 显式指定AWS区域
         aws_region = os.getenv('AWS_REGION', 'us-west-2')
-        self.runtime = boto3.client('sagemaker-runtime', region_name=aws_region)
+        self.runtime = get_client('sagemaker-runtime', aws_region, SAGEMAKER_CONFIG)
         
-    def rerank(self, query, passages, top_k=None):
+    def score(self, query, passages):
         """
-        使用BGE模型对文本段落进行重排序
+        计算每个文本段落与查询的相关性分数
+        
+        段落按 chunk_size 切块，多个分块并发调用端点后按原顺序拼接。
         
         Args:
             query (str): 查询文本
-            passages (list): 待重排序的文本段落列表
-            top_k (int, optional): 返回前k个结果，默认返回所有结果
+            passages (list): 文本段落列表
             
         Returns:
-            list: 重排序后的结果，每个元素包含文本内容和分数
+            list: 与passages顺序一致的分数列表，任一分块调用失败时返回None
         """
         if not passages:
             return []
-            
+        
+        chunks = [passages[i:i + self.chunk_size] for i in range(0, len(passages), self.chunk_size)]
+        if len(chunks) == 1 or self.max_workers <= 1:
+            chunk_scores = [self._score_chunk(query, chunk) for chunk in chunks]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(chunks))) as pool:
+                chunk_scores = list(pool.map(lambda chunk: self._score_chunk(query, chunk), chunks))
+        
+        scores = []
+        for chunk, chunk_score in zip(chunks, chunk_scores):
+            if chunk_score is None or len(chunk_score) != len(chunk):
+                return None
+            scores.extend(chunk_score)
+        return scores
+    
+    def _score_chunk(self, query, passages):
+        """调用一次端点计算一个分块的分数，失败时返回None"""
         # 构建正确的输入格式
         input_data = {
             "text_1": query,
@@ -36,28 +67,50 @@ class BGEReranker:
             response = self.runtime.invoke_endpoint(
                 EndpointName=self.endpoint_name,
                 ContentType='application/json',
-                Body=json.dumps(input_data)
+                Body=orjson.dumps(input_data)
             )
             
-            response_body = json.loads(response['Body'].read().decode())
+            response_body = orjson.loads(response['Body'].read())
             
             if isinstance(response_body, dict) and 'data' in response_body:
                 # 从data字段中提取分数
-                scores = [item['score'] for item in response_body['data']]
-                results = [
-                    {"text": text, "score": float(score)} 
-                    for text, score in zip(passages, scores)
-                ]
-                results.sort(key=lambda x: x['score'], reverse=True)
-                
-                if top_k:
-                    results = results[:top_k]
-                    
-                return results
+                return [float(item['score']) for item in response_body['data']]
             else:
-                print(f"意外的响应格式: {response_body}")
-                return []
+                logger.warning("意外的响应格式: %s", response_body)
+                return None
             
         except Exception as e:
-            print(f"重排序过程中发生错误: {str(e)}")
-            return []
\ No newline at end of file
+            logger.error("重排序过程中发生错误: %s", e)
+            return None
+        
+    def rerank(self, query, passages, top_k=None):
+        """
+        使用BGE模型对文本段落进行重排序
+        
+        Args:
+            query (str): 查询文本
+            passages (list): 待重排序的文本段落列表
+            top_k (int, optional): 返回前k个结果，默认返回所有结果
+            
+        Returns:
+            list: 重排序后的结果，每个元素包含文本内容和分数
+        """
+        if not passages:
+            return []
+        
+        scores = self.score(query, passages)
+        if not scores:
+            return []
+        
+        scores = np.asarray(scores)
+        if top_k and top_k < len(scores):
+            # 只对前k个做排序：argpartition为O(N)，避免对全部分数排序
+            top_indices = np.argpartition(scores, -top_k)[-top_k:]
+            order = top_indices[np.argsort(-scores[top_indices])]
+        else:
+            order = np.argsort(-scores)
+        
+        return [
+            {"text": passages[i], "score": float(scores[i])}
+            for i in order
+        ]
@@ -2,15 +2,153 @@
 S3+DynamoDB缓存模块 - 将搜索结果存储到S3，在DynamoDB中存储S3路径
 """
 
-import json
+import io
+import gzip
+import hashlib
+import logging
+import asyncio
+import time
 import uuid
+import queue
+import atexit
+import threading
+import weakref
+from operator import attrgetter
+import orjson
+import zstandard
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import Dict, Any, Optional, List
 from decimal import Decimal
-import boto3
+from typing import Dict, Any, Optional, List, Tuple
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError
+from cachetools import LRUCache, TTLCache
+from .aws import get_client, get_resource
+from .bloom import BloomFilter
 from .models import SearchResponse, SearchResult
 
+logger = logging.getLogger(__name__)
+
+# BatchWriteItem 单次请求最多25项
+MAX_DYNAMO_BATCH_WRITE_ITEM_COUNT = 25
+# BatchGetItem 单次请求最多100个键
+MAX_DYNAMO_BATCH_GET_ITEM_COUNT = 100
+# 未处理项的最大重试次数
+_BATCH_WRITE_MAX_RETRIES = 8
+# 批量保存时并发上传S3的最大线程数
+_BATCH_UPLOAD_MAX_WORKERS = 8
+# 压缩后不超过该大小的结果直接内联存入DynamoDB（单项上限400KB，预留元数据空间），超过则存S3
+INLINE_RESULT_MAX_BYTES = 350 * 1024
+# 序列化结果的记忆化容量：同一个SearchResponse对象被多次保存时复用已序列化的结果列表
+_SERIALIZED_MEMO_MAXSIZE = 64
+# 缓存条目的DynamoDB TTL：30天
+_RESULT_TTL_SECONDS = 30 * 24 * 60 * 60
+# 按查询文本查找缓存的GSI：优先使用以规范化查询哈希为键的GSI，表中未创建时回退到以原始query为键的GSI
+QUERY_HASH_GSI_NAME = 'query_hash-created_at-index'
+QUERY_GSI_NAME = 'query-created_at-index'
+# 用户搜索历史GSI，按优先顺序尝试
+_HISTORY_GSI_NAMES = ('user_id-created_at-index', 'user_id-timestamp-index')
+# 元数据读取时投影的属性（不含内联的results_blob），主键名运行时检测后追加
+_METADATA_ATTRIBUTES = (
+    'search_id', 'query', 'search_type', 'enable_llm', 'total_results', 'results_count',
+    'rewritten_terms', 'timestamp', 'created_at', 'ttl', 's3_key', 's3_bucket', 'user_id',
+    'status', 'error_message'
+)
+# delete_objects 单次请求最多1000个键
+S3_DELETE_OBJECTS_MAX_KEYS = 1000
+# 进程内读缓存：按search_id缓存元数据与完整结果，按(user_id, limit)缓存搜索历史
+_META_CACHE_MAXSIZE = 2048
+_RESULT_CACHE_MAXSIZE = 256
+_HISTORY_CACHE_MAXSIZE = 1024
+_READ_CACHE_TTL = 300
+# 未找到的search_id短时间内直接返回None（轮询未完成的异步任务时避免反复查询DynamoDB）
+_MISS_CACHE_MAXSIZE = 4096
+_MISS_CACHE_TTL = 5
+# 缓存统计信息的有效期（秒）：describe_table为控制面API且有速率限制，ItemCount本身约每6小时才更新
+_STATS_CACHE_TTL = 30
+# 后台写入队列容量与攒批等待时间
+_WRITE_QUEUE_MAXSIZE = 10_000
+_WRITE_COALESCE_SECONDS = 0.5
+# 进程退出/服务关闭时等待写入队列清空的最长时间（秒），避免写入线程异常时关闭流程卡死
+_FLUSH_TIMEOUT_SECONDS = 30
+# 完整结果的压缩编码：新数据用zstd，读取时兼容gzip及未压缩的旧数据
+PAYLOAD_ENCODING = 'zstd'
+_ZSTD_LEVEL = 3
+# 超过该大小的S3对象分段并发上传，小对象仍用单次put_object避免分段开销
+S3_MULTIPART_THRESHOLD = 8 * 1024 * 1024
+_S3_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=S3_MULTIPART_THRESHOLD,
+    multipart_chunksize=S3_MULTIPART_THRESHOLD,
+    max_concurrency=8,
+    use_threads=True
+)
+# 下载时按该大小分段并发Range GET，首段请求同时返回对象总大小
+S3_RANGE_CHUNK_BYTES = 8 * 1024 * 1024
+_S3_RANGE_MAX_WORKERS = 8
+
+
+def query_hash(query_text: str) -> str:
+    """规范化查询（去除首尾空白、合并连续空白、转小写）后计算128位blake2b哈希"""
+    normalized = " ".join(query_text.strip().lower().split())
+    return hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _json_default(obj: Any) -> Any:
+    """orjson无法直接序列化的类型：DynamoDB读出的数字为Decimal"""
+    if isinstance(obj, Decimal):
+        return int(obj) if obj == obj.to_integral_value() else float(obj)
+    raise TypeError(f"无法序列化类型: {type(obj).__name__}")
+
+
+# 表的主键结构运行期间不会变化，同一进程内按 (区域, 表名) 只调用一次describe_table
+_primary_key_cache: Dict[tuple, str] = {}
+_primary_key_lock = threading.Lock()
+
+
+# 热路径（保存、按ID读取、批量读写）直接使用DynamoDB低级客户端，
+# 属性值转换复用同一对序列化器，跳过resource层每次调用的参数转换
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+
+def _to_attribute_values(item: Dict[str, Any]) -> Dict[str, Any]:
+    """普通字典转为DynamoDB AttributeValue格式"""
+    serialize = _serializer.serialize
+    return {key: serialize(value) for key, value in item.items()}
+
+
+def _from_attribute_values(item: Dict[str, Any]) -> Dict[str, Any]:
+    """DynamoDB AttributeValue格式转为普通字典（数字为Decimal，二进制为Binary，与resource层一致）"""
+    deserialize = _deserializer.deserialize
+    return {key: deserialize(value) for key, value in item.items()}
+
+
+# 单条删除时与DynamoDB删除并发执行S3删除的共享线程池
+_delete_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="search-cache-delete")
+
+
+# 一次取出序列化所需的全部SearchResult字段
+_get_result_fields = attrgetter(
+    'id', 'title', 'keywords', 'abstract', 'score', 'source', 'matched_keywords', 'relevance_reason'
+)
+
+
+# zstd压缩/解压上下文不能被多个线程同时使用，每个线程各持有一份
+_zstd_local = threading.local()
+
+
+def _zstd_compressor() -> zstandard.ZstdCompressor:
+    if not hasattr(_zstd_local, 'compressor'):
+        _zstd_local.compressor = zstandard.ZstdCompressor(level=_ZSTD_LEVEL)
+    return _zstd_local.compressor
+
+
+def _zstd_decompressor() -> zstandard.ZstdDecompressor:
+    if not hasattr(_zstd_local, 'decompressor'):
+        _zstd_local.decompressor = zstandard.ZstdDecompressor()
+    return _zstd_local.decompressor
+
 
 class SearchCache:  # 类名已从 S3Cache 更改为 SearchCache
     """S3+DynamoDB缓存管理器"""
@@ -18,7 +156,11 @@ class SearchCache:  # 类名已从 S3Cache 更改为 SearchCache
     def __init__(self, 
                  bucket_name: str = "async-papaer-search-results", 
                  table_name: str = "asyncSearchCache", 
-                 region_name: str = "us-west-2"):
+                 region_name: str = "us-west-2",
+                 background_writes: bool = False,
+                 inline_max_bytes: int = INLINE_RESULT_MAX_BYTES,
+                 bloom_capacity: int = 0,
+                 primary_key: Optional[str] = None):
         """
         初始化S3+DynamoDB缓存
         
@@ -26,120 +168,302 @@ class SearchCache:  # 类名已从 S3Cache 更改为 SearchCache
             bucket_name: S3存储桶名称
             table_name: DynamoDB表名
             region_name: AWS区域
+            background_writes: 是否由后台线程攒批写入，save_search_result立即返回search_id
+            inline_max_bytes: 压缩后不超过该大小的结果内联存入DynamoDB，0表示总是存S3
+                （上限为 INLINE_RESULT_MAX_BYTES，保证不超过DynamoDB单项400KB）
+            bloom_capacity: 大于0时启用search_id布隆过滤器（容量为该值），启动时扫描表中已有ID，
+                之后一定不存在的ID不再查询DynamoDB。其他进程写入的ID不会进入本进程的过滤器，
+                只适用于单进程写入的部署
+            primary_key: 表的主键名；提供时直接使用，不再调用describe_table检测
         """
         self.bucket_name = bucket_name
         self.table_name = table_name
         self.region_name = region_name
+        self.inline_max_bytes = max(0, min(inline_max_bytes, INLINE_RESULT_MAX_BYTES))
         
         # 初始化S3客户端
         try:
-            self.s3_client = boto3.client('s3', region_name=region_name)
-            print(f"✅ S3客户端初始化成功 - 存储桶: {bucket_name}, 区域: {region_name}")
+            self.s3_client = get_client('s3', region_name)
+            logger.info("✅ S3客户端初始化成功 - 存储桶: %s, 区域: %s", bucket_name, region_name)
         except Exception as e:
-            print(f"❌ S3客户端初始化失败: {e}")
+            logger.error("❌ S3客户端初始化失败: %s", e)
             self.s3_client = None
         
         # 初始化DynamoDB客户端
         try:
-            self.dynamodb = boto3.resource('dynamodb', region_name=region_name)
+            self.dynamodb = get_resource('dynamodb', region_name)
             self.table = self.dynamodb.Table(table_name)
+            self.ddb_client = get_client('dynamodb', region_name)
             
-            # 自动检测表的主键结构
-            self.primary_key = self._detect_primary_key()
-            print(f"✅ DynamoDB缓存初始化成功 - 表: {table_name}, 区域: {region_name}, 主键: {self.primary_key}")
+            # 使用配置的主键，未配置时自动检测表的主键结构
+            self.primary_key = primary_key or self._detect_primary_key()
+            logger.info("✅ DynamoDB缓存初始化成功 - 表: %s, 区域: %s, 主键: %s", table_name, region_name, self.primary_key)
         except Exception as e:
-            print(f"❌ DynamoDB缓存初始化失败: {e}")
+            logger.error("❌ DynamoDB缓存初始化失败: %s", e)
             self.dynamodb = None
             self.table = None
+            self.ddb_client = None
             self.primary_key = 'cache_key'  # 默认主键
+        
+        # 元数据查询的ProjectionExpression：属性名统一用占位符，避开query/timestamp/status等保留字
+        attributes = dict.fromkeys((self.primary_key,) + _METADATA_ATTRIBUTES)
+        self._metadata_projection = {
+            'ProjectionExpression': ', '.join(f"#m{i}" for i in range(len(attributes))),
+            'ExpressionAttributeNames': {f"#m{i}": name for i, name in enumerate(attributes)}
+        }
+        # 搜索历史查询中每次调用都不变的参数，以及确认可用的历史GSI
+        self._history_query_template = {
+            'KeyConditionExpression': 'user_id = :user_id',
+            'ScanIndexForward': False,  # 按时间戳降序排列
+            **self._metadata_projection
+        }
+        self._history_gsi: Optional[str] = None
+        # query_hash GSI是否可用，确认不存在后直接使用原始query的GSI
+        self._query_hash_gsi_available = True
+        
+        # 键为id(response)，值为 (response弱引用, results列表id, 结果数, 序列化结果)
+        self._serialized_memo: LRUCache = LRUCache(maxsize=_SERIALIZED_MEMO_MAXSIZE)
+        self._serialized_memo_lock = threading.Lock()
+        
+        # 读缓存只保存成功读取的结果；未找到的search_id另记入短TTL的_miss_cache，写入时立即失效
+        self._meta_cache: TTLCache = TTLCache(maxsize=_META_CACHE_MAXSIZE, ttl=_READ_CACHE_TTL)
+        self._result_cache: TTLCache = TTLCache(maxsize=_RESULT_CACHE_MAXSIZE, ttl=_READ_CACHE_TTL)
+        self._history_cache: TTLCache = TTLCache(maxsize=_HISTORY_CACHE_MAXSIZE, ttl=_READ_CACHE_TTL)
+        self._miss_cache: TTLCache = TTLCache(maxsize=_MISS_CACHE_MAXSIZE, ttl=_MISS_CACHE_TTL)
+        self._read_cache_lock = threading.Lock()
+        
+        # search_id布隆过滤器：后台扫描完已有ID之前不用于判断
+        self._bloom: Optional[BloomFilter] = None
+        self._bloom_ready = threading.Event()
+        if bloom_capacity > 0 and self.table:
+            self._bloom = BloomFilter(bloom_capacity)
+            threading.Thread(target=self._seed_bloom, name="search-cache-bloom", daemon=True).start()
+        
+        # 缓存统计信息 (统计结果, 获取时间)
+        self._stats_cache: tuple = (None, 0.0)
+        
+        # 后台写入队列：请求线程只负责入队，写入线程按批上传S3并批量写入DynamoDB
+        self._write_queue: Optional[queue.Queue] = None
+        if background_writes:
+            self._write_queue = queue.Queue(maxsize=_WRITE_QUEUE_MAXSIZE)
+            self._writer = threading.Thread(target=self._write_loop, name="search-cache-writer", daemon=True)
+            self._writer.start()
+            atexit.register(self.flush)
+            logger.info("✅ 缓存后台写入线程已启动")
     
     def _detect_primary_key(self) -> str:
-        """自动检测DynamoDB表的主键"""
+        """自动检测DynamoDB表的主键（检测成功的结果在进程内复用）"""
+        cache_key = (self.region_name, self.table_name)
+        with _primary_key_lock:
+            cached = _primary_key_cache.get(cache_key)
+        if cached:
+            return cached
+        
         try:
-            print(f"🔍 正在检测表 {self.table_name} 的主键...")
+            logger.debug("🔍 正在检测表 %s 的主键...", self.table_name)
             table_info = self.table.meta.client.describe_table(TableName=self.table_name)
             key_schema = table_info['Table']['KeySchema']
             
-            print(f"   表状态: {table_info['Table']['TableStatus']}")
-            print(f"   主键结构: {key_schema}")
+            logger.debug("   表状态: %s", table_info['Table']['TableStatus'])
+            logger.debug("   主键结构: %s", key_schema)
             
             # 查找主键名称
             for key in key_schema:
                 if key['KeyType'] == 'HASH':
                     primary_key = key['AttributeName']
-                    print(f"✅ 检测到主键: {primary_key}")
+                    logger.info("✅ 检测到主键: %s", primary_key)
+                    with _primary_key_lock:
+                        _primary_key_cache[cache_key] = primary_key
                     return primary_key
             
             # 如果没有找到，使用默认值
-            print("⚠️  未找到HASH主键，使用默认值: cache_key")
+            logger.warning("⚠️  未找到HASH主键，使用默认值: cache_key")
             return 'cache_key'
             
         except Exception as e:
-            print(f"❌ 主键检测失败: {e}")
-            print(f"   使用默认值: cache_key")
+            logger.error("❌ 主键检测失败: %s", e)
+            logger.warning("   使用默认值: cache_key")
             return 'cache_key'
     
+    def _read_cache_get(self, cache: TTLCache, key: Any) -> Optional[Any]:
+        """线程安全地读取读缓存"""
+        with self._read_cache_lock:
+            return cache.get(key)
+    
+    def _read_cache_put(self, cache: TTLCache, key: Any, value: Any):
+        """线程安全地写入读缓存"""
+        with self._read_cache_lock:
+            cache[key] = value
+    
+    def _invalidate_read_cache(self, search_id: str, user_id: Optional[str] = None):
+        """写入或删除后使对应的读缓存失效"""
+        with self._read_cache_lock:
+            self._meta_cache.pop(search_id, None)
+            self._result_cache.pop(search_id, None)
+            self._miss_cache.pop(search_id, None)
+            if user_id:
+                for key in [key for key in self._history_cache if key[0] == user_id]:
+                    self._history_cache.pop(key, None)
+    
+    def _seed_bloom(self):
+        """扫描表中已有的search_id加入布隆过滤器（只投影主键）"""
+        try:
+            kwargs = {
+                'ProjectionExpression': '#pk',
+                'ExpressionAttributeNames': {'#pk': self.primary_key}
+            }
+            while True:
+                response = self.table.scan(**kwargs)
+                for item in response.get('Items', []):
+                    self._bloom.add(item[self.primary_key])
+                if 'LastEvaluatedKey' not in response:
+                    break
+                kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+            self._bloom_ready.set()
+            logger.info("✅ search_id布隆过滤器已就绪 - 已载入 %s 个ID", self._bloom.count)
+        except Exception as e:
+            # 载入失败时不启用过滤器，读取照常查询DynamoDB
+            logger.warning("⚠️  布隆过滤器载入失败，不启用: %s", e)
+    
+    def _remember_search_id(self, search_id: Optional[str]):
+        """记录已写入的search_id"""
+        if self._bloom is not None and search_id:
+            self._bloom.add(search_id)
+    
+    def _known_missing(self, search_id: str) -> bool:
+        """search_id是否确定不存在（布隆过滤器未命中或近期查询未找到）"""
+        if self._bloom_ready.is_set() and search_id not in self._bloom:
+            return True
+        return bool(self._read_cache_get(self._miss_cache, search_id))
+    
     def generate_search_id(self) -> str:
         """生成唯一的搜索ID"""
         return str(uuid.uuid4())
     
     def _serialize_search_results(self, results: List[SearchResult]) -> List[Dict]:
-        """序列化搜索结果为JSON兼容格式"""
-        serialized_results = []
-        for result in results:
-            # 将SearchResult对象转换为字典
-            result_dict = {
-                "id": result.id,
-                "title": result.title,
-                "keywords": result.keywords or [],
-                "abstract": result.abstract,
-                "score": float(result.score) if result.score is not None else 0.0,
-                "source": result.source or "",
-                "matched_keywords": result.matched_keywords or [],
-                "relevance_reason": result.relevance_reason or ""
+        """
+        序列化搜索结果为JSON兼容格式（单个推导式构建，attrgetter一次取出所有字段）
+        
+        score原样保留（可能是numpy标量），由orjson在编码时转换，不再逐项调用float()。
+        上游已给出JSON兼容的字典（如model_construct传入的dict或model_dump结果）时直接复用，不再重建。
+        """
+        if any(type(result) is dict for result in results):
+            if all(type(result) is dict for result in results):
+                return list(results)
+            results = [SearchResult.model_construct(**r) if type(r) is dict else r for r in results]
+        return [
+            {
+                "id": id_,
+                "title": title,
+                "keywords": keywords or [],
+                "abstract": abstract,
+                "score": 0.0 if score is None else score,
+                "source": source or "",
+                "matched_keywords": matched_keywords or [],
+                "relevance_reason": relevance_reason or ""
             }
-            serialized_results.append(result_dict)
-        return serialized_results
+            for id_, title, keywords, abstract, score, source, matched_keywords, relevance_reason
+            in map(_get_result_fields, results)
+        ]
+    
+    def _encode_payload(self, data: Dict[str, Any]) -> bytes:
+        """将完整结果数据编码为zstd压缩的紧凑JSON（orjson直接输出UTF-8字节）"""
+        return _zstd_compressor().compress(
+            orjson.dumps(data, default=_json_default, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+        )
+    
+    def _decode_payload(self, raw: bytes, encoding: Optional[str] = 'gzip') -> Dict[str, Any]:
+        """
+        解码完整结果数据
+        
+        Args:
+            raw: 原始字节
+            encoding: 压缩编码，zstd、gzip，None表示未压缩的旧数据
+        """
+        if encoding == 'zstd':
+            # 压缩帧中记录了原始大小，decompress可一次分配输出缓冲区
+            raw = _zstd_decompressor().decompress(raw)
+        elif encoding == 'gzip':
+            raw = gzip.decompress(raw)
+        return orjson.loads(raw)
     
-    def _upload_to_s3(self, search_id: str, data: Dict[str, Any]) -> Optional[str]:
+    def _serialize_response_results(self, response: SearchResponse) -> List[Dict]:
+        """
+        序列化响应中的结果列表，同一响应对象重复保存时直接复用上次的序列化结果
+        
+        以id(response)为键，并通过弱引用和results列表身份确认仍是同一对象且内容未被替换，
+        防止对象被回收后id复用导致误命中。
+        """
+        key = id(response)
+        with self._serialized_memo_lock:
+            entry = self._serialized_memo.get(key)
+        if entry is not None:
+            ref, results_id, count, serialized = entry
+            if ref() is response and results_id == id(response.results) and count == len(response.results):
+                return serialized
+        
+        serialized = self._serialize_search_results(response.results)
+        try:
+            entry = (weakref.ref(response), id(response.results), len(response.results), serialized)
+        except TypeError:
+            return serialized  # 不支持弱引用的对象不做记忆化
+        with self._serialized_memo_lock:
+            self._serialized_memo[key] = entry
+        return serialized
+    
+    def _upload_to_s3(self, search_id: str, body: bytes, key_date: Optional[str] = None) -> Optional[str]:
         """
         将数据上传到S3
         
         Args:
             search_id: 搜索ID
-            data: 要上传的数据
+            body: _encode_payload 编码后的数据
+            key_date: S3键中的日期路径（YYYY/MM/DD），由调用方按保存时刻传入，缺省为当前UTC日期
             
         Returns:
             S3对象键，如果上传失败返回None
         """
         if not self.s3_client:
-            print("❌ S3客户端未初始化，无法上传数据")
+            logger.error("❌ S3客户端未初始化，无法上传数据")
             return None
         
         try:
             # 生成S3对象键
-            s3_key = f"search-results/{datetime.now().strftime('%Y/%m/%d')}/{search_id}.json"
+            if key_date is None:
+                key_date = datetime.now(timezone.utc).strftime('%Y/%m/%d')
+            s3_key = f"search-results/{key_date}/{search_id}.json.zst"
             
-            # 将数据转换为JSON字符串
-            json_data = json.dumps(data, ensure_ascii=False, indent=2)
+            extra_args = {
+                'ContentType': 'application/json',
+                'ContentEncoding': PAYLOAD_ENCODING,
+                'ServerSideEncryption': 'AES256'
+            }
             
-            # 上传到S3
-            self.s3_client.put_object(
-                Bucket=self.bucket_name,
-                Key=s3_key,
-                Body=json_data.encode('utf-8'),
-                ContentType='application/json',
-                ServerSideEncryption='AES256'
-            )
+            # 上传到S3：大对象分段并发上传，小对象单次上传
+            if len(body) >= S3_MULTIPART_THRESHOLD:
+                self.s3_client.upload_fileobj(
+                    io.BytesIO(body),
+                    self.bucket_name,
+                    s3_key,
+                    ExtraArgs=extra_args,
+                    Config=_S3_TRANSFER_CONFIG
+                )
+            else:
+                self.s3_client.put_object(
+                    Bucket=self.bucket_name,
+                    Key=s3_key,
+                    Body=body,
+                    **extra_args
+                )
             
-            print(f"✅ 搜索结果已上传到S3 - 键: {s3_key}")
+            logger.debug("✅ 搜索结果已上传到S3 - 键: %s", s3_key)
             return s3_key
             
         except ClientError as e:
-            print(f"❌ S3上传失败 - ClientError: {e}")
+            logger.error("❌ S3上传失败 - ClientError: %s", e)
             return None
         except Exception as e:
-            print(f"❌ S3上传失败 - Exception: {e}")
+            logger.error("❌ S3上传失败 - Exception: %s", e)
             return None
     
     def _download_from_s3(self, s3_key: str) -> Optional[Dict[str, Any]]:
@@ -153,28 +477,161 @@ class SearchCache:  # 类名已从 S3Cache 更改为 SearchCache
             下载的数据，如果下载失败返回None
         """
         if not self.s3_client:
-            print("❌ S3客户端未初始化，无法下载数据")
+            logger.error("❌ S3客户端未初始化，无法下载数据")
             return None
         
         try:
-            # 从S3下载对象
+            # 先请求第一段：小对象一次取完，大对象从Content-Range得到总大小
             response = self.s3_client.get_object(
                 Bucket=self.bucket_name,
-                Key=s3_key
+                Key=s3_key,
+                Range=f"bytes=0-{S3_RANGE_CHUNK_BYTES - 1}"
             )
+            first = response['Body'].read()
+            content_range = response.get('ContentRange')
+            total = int(content_range.rsplit('/', 1)[1]) if content_range else len(first)
             
-            # 读取并解析JSON数据
-            json_data = response['Body'].read().decode('utf-8')
-            data = json.loads(json_data)
+            if total > len(first):
+                raw = self._download_remaining_ranges(s3_key, first, total)
+            else:
+                raw = first
             
-            return data
+            # 按对象的ContentEncoding解码（兼容gzip及未压缩的旧对象）
+            return self._decode_payload(raw, encoding=response.get('ContentEncoding'))
             
         except ClientError as e:
-            print(f"❌ S3下载失败 - ClientError: {e}")
+            logger.error("❌ S3下载失败 - ClientError: %s", e)
             return None
         except Exception as e:
-            print(f"❌ S3下载失败 - Exception: {e}")
+            logger.error("❌ S3下载失败 - Exception: %s", e)
+            return None
+    
+    def _download_remaining_ranges(self, s3_key: str, first: bytes, total: int) -> bytearray:
+        """并发下载首段之后的各个字节区间，写入预分配的缓冲区"""
+        buf = bytearray(total)
+        buf[:len(first)] = first
+        
+        def fetch(start: int):
+            end = min(start + S3_RANGE_CHUNK_BYTES, total) - 1
+            part = self.s3_client.get_object(
+                Bucket=self.bucket_name,
+                Key=s3_key,
+                Range=f"bytes={start}-{end}"
+            )['Body'].read()
+            buf[start:start + len(part)] = part
+        
+        starts = range(len(first), total, S3_RANGE_CHUNK_BYTES)
+        with ThreadPoolExecutor(max_workers=min(_S3_RANGE_MAX_WORKERS, len(starts))) as pool:
+            list(pool.map(fetch, starts))
+        return buf
+    
+    def _load_full_data(self, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        读取缓存条目对应的完整结果数据：优先使用内联的results_blob，否则从S3下载
+        
+        Args:
+            item: DynamoDB中的缓存条目
+        """
+        blob = item.get('results_blob')
+        if blob is not None:
+            # boto3将Binary属性读取为Binary对象，原始字节在value中
+            raw = blob.value if hasattr(blob, 'value') else bytes(blob)
+            # 没有results_encoding字段的旧条目为gzip
+            return self._decode_payload(raw, encoding=item.get('results_encoding', 'gzip'))
+        
+        s3_key = item.get('s3_key')
+        if not s3_key:
+            logger.error("❌ 缓存条目 (ID: %s) 既无内联结果也无s3_key。", item.get(self.primary_key))
             return None
+        return self._download_from_s3(s3_key)
+    
+    def _prepare_cache_item(self,
+                            query: str,
+                            search_type: str,
+                            response: SearchResponse,
+                            enable_llm: bool = False,
+                            user_id: Optional[str] = None,
+                            search_id: Optional[str] = None,
+                            page_size: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        构建要写入DynamoDB的缓存项
+        
+        完整结果压缩后不超过 self.inline_max_bytes 时以Binary属性内联存储，
+        否则上传到S3，DynamoDB中只记录S3路径。
+        只有提供page_size的条目（第一页、无游标、未深度召回）才会被按查询文本的缓存查找复用。
+        
+        Returns:
+            DynamoDB缓存项，如果S3上传失败返回None
+        """
+        # 如果没有提供search_id，则生成一个新的
+        if not search_id:
+            search_id = self.generate_search_id()
+        
+        # 所有时间字段使用同一时刻，S3/内联数据与DynamoDB元数据共用同一组字段值
+        now = time.time()
+        now_dt = datetime.fromtimestamp(now, tz=timezone.utc)
+        now_iso = now_dt.isoformat()
+        created_at = int(now)
+        expires_at = created_at + _RESULT_TTL_SECONDS
+        total_results = response.total
+        rewritten_terms = response.rewrittenTerms or []
+        
+        # 准备要上传到S3的完整搜索结果数据
+        s3_data = {
+            'search_id': search_id,
+            'query': query,
+            'search_type': search_type,
+            'enable_llm': enable_llm,
+            'total_results': total_results,
+            'results': self._serialize_response_results(response),
+            'rewritten_terms': rewritten_terms,
+            'next_search_after': response.nextSearchAfter,
+            'timestamp': now_iso,
+            'created_at': created_at,
+            'user_id': user_id
+        }
+        
+        body = self._encode_payload(s3_data)
+        
+        # 结果较大时上传完整数据到S3
+        s3_key = None
+        if len(body) > self.inline_max_bytes:
+            s3_key = self._upload_to_s3(search_id, body, now_dt.strftime('%Y/%m/%d'))
+            if not s3_key:
+                return None
+        
+        # 在DynamoDB中保存元数据，以及内联结果或S3路径
+        ddb_item = {
+            self.primary_key: search_id,  # 使用动态检测的主键
+            'search_id': search_id,  # 保留search_id字段用于兼容性
+            'query': query,
+            'query_hash': query_hash(query),  # query_hash GSI的哈希键
+            'search_type': search_type,
+            'enable_llm': enable_llm,
+            'total_results': total_results,
+            'results_count': len(response.results),  # 结果数量
+            'rewritten_terms': rewritten_terms,
+            'timestamp': now_iso,
+            'created_at': created_at,
+            'ttl': expires_at
+        }
+        
+        if s3_key:
+            ddb_item['s3_key'] = s3_key  # S3对象键
+            ddb_item['s3_bucket'] = self.bucket_name  # S3存储桶名称
+        else:
+            ddb_item['results_blob'] = body  # 压缩后的完整结果
+            ddb_item['results_encoding'] = PAYLOAD_ENCODING
+        
+        # 记录每页大小，缺少该属性的条目不会被按查询文本的缓存查找命中
+        if page_size:
+            ddb_item['page_size'] = page_size
+        
+        # 添加用户ID（如果提供）
+        if user_id:
+            ddb_item['user_id'] = user_id
+        
+        return ddb_item
     
     def save_search_result(self, 
                           query: str, 
@@ -182,7 +639,8 @@ class SearchCache:  # 类名已从 S3Cache 更改为 SearchCache
                           response: SearchResponse,
                           enable_llm: bool = False,
                           user_id: Optional[str] = None,
-                          search_id: Optional[str] = None) -> Optional[str]:
+                          search_id: Optional[str] = None,
+                          page_size: Optional[int] = None) -> Optional[str]:
         """
         保存搜索结果到S3+DynamoDB
         
@@ -193,155 +651,305 @@ class SearchCache:  # 类名已从 S3Cache 更改为 SearchCache
             enable_llm: 是否启用LLM评估
             user_id: 用户ID（可选）
             search_id: 预生成的搜索ID（可选）
+            page_size: 每页结果数，仅第一页、无游标且未深度召回的结果传入，供按查询文本复用（可选）
             
         Returns:
             搜索ID，如果保存失败返回None
         """
         if not self.table or not self.s3_client:
-            print("❌ S3或DynamoDB未初始化，无法保存搜索结果")
+            logger.error("❌ S3或DynamoDB未初始化，无法保存搜索结果")
             return None
         
-        try:
-            # 如果没有提供search_id，则生成一个新的
+        if self._write_queue is not None:
             if not search_id:
                 search_id = self.generate_search_id()
-            
-            # 准备要上传到S3的完整搜索结果数据
-            s3_data = {
-                'search_id': search_id,
-                'query': query,
-                'search_type': search_type,
-                'enable_llm': enable_llm,
-                'total_results': response.total,
-                'results': self._serialize_search_results(response.results),
-                'rewritten_terms': response.rewrittenTerms or [],
-                'timestamp': datetime.now(timezone.utc).isoformat(),
-                'created_at': int(datetime.now(timezone.utc).timestamp()),
-                'user_id': user_id
-            }
-            
-            # 上传完整数据到S3
-            s3_key = self._upload_to_s3(search_id, s3_data)
-            if not s3_key:
+            try:
+                self._write_queue.put_nowait({
+                    'query': query,
+                    'search_type': search_type,
+                    'response': response,
+                    'enable_llm': enable_llm,
+                    'user_id': user_id,
+                    'search_id': search_id,
+                    'page_size': page_size
+                })
+                return search_id
+            except queue.Full:
+                logger.warning("⚠️  缓存写入队列已满，改为同步写入")
+        
+        try:
+            ddb_item = self._prepare_cache_item(query, search_type, response, enable_llm, user_id, search_id, page_size)
+            if not ddb_item:
                 return None
-            
-            # 在DynamoDB中只保存元数据和S3路径
-            ddb_item = {
-                self.primary_key: search_id,  # 使用动态检测的主键
-                'search_id': search_id,  # 保留search_id字段用于兼容性
-                'query': query,
-                'search_type': search_type,
-                'enable_llm': enable_llm,
-                'total_results': response.total,
-                'results_count': len(response.results),  # 只存储结果数量
-                's3_key': s3_key,  # S3对象键
-                's3_bucket': self.bucket_name,  # S3存储桶名称
-                'rewritten_terms': response.rewrittenTerms or [],
-                'timestamp': datetime.now(timezone.utc).isoformat(),
-                'created_at': int(datetime.now(timezone.utc).timestamp()),
-                'ttl': int(datetime.now(timezone.utc).timestamp()) + (30 * 24 * 60 * 60)  # 30天TTL
-            }
-            
-            # 添加用户ID（如果提供）
-            if user_id:
-                ddb_item['user_id'] = user_id
+            search_id = ddb_item['search_id']
             
             # 保存元数据到DynamoDB
-            print(f"🔄 正在保存到DynamoDB...")
-            print(f"   主键: {self.primary_key} = {search_id}")
-            print(f"   DDB项目: {list(ddb_item.keys())}") # 打印键以供调试
+            logger.debug("🔄 正在保存到DynamoDB...")
+            logger.debug("   主键: %s = %s", self.primary_key, search_id)
+            logger.debug("   DDB项目: %s", list(ddb_item.keys())) # 打印键以供调试
             
-            self.table.put_item(Item=ddb_item)
+            self._remember_search_id(search_id)
+            self.ddb_client.put_item(TableName=self.table_name, Item=_to_attribute_values(ddb_item))
+            self._invalidate_read_cache(search_id, user_id)
             
-            print(f"✅ 搜索结果已保存 - ID: {search_id}, S3键: {s3_key}")
+            logger.debug("✅ 搜索结果已保存 - ID: %s, S3键: %s", search_id, ddb_item.get('s3_key', '内联存储'))
             return search_id
             
         except ClientError as e:
-            print(f"❌ 保存搜索结果失败 - ClientError: {e}")
+            logger.error("❌ 保存搜索结果失败 - ClientError: %s", e)
             return None
         except Exception as e:
-            print(f"❌ 保存搜索结果失败 - Exception: {e}")
+            logger.error("❌ 保存搜索结果失败 - Exception: %s", e)
             return None
     
-    def get_cached_response_by_query_and_type(self, query_text: str, search_type: str, enable_llm: bool) -> Optional[SearchResponse]:
+    def save_search_results_batch(self, items: List[Dict[str, Any]]) -> List[Optional[str]]:
         """
-        根据查询文本、搜索类型和LLM启用状态从缓存中检索完整的SearchResponse。
-        假设DynamoDB中存在名为 'query-created_at-index' 的GSI，
-        其中 'query' 是哈希键，'created_at' 是范围键 (Unix timestamp)。
+        批量保存搜索结果到S3+DynamoDB
+        
+        各项的S3上传相互独立，在线程池中并发执行；DynamoDB元数据通过
+        BatchWriteItem每批最多25项写入，未处理的项按指数退避重试。
+        
+        Args:
+            items: 每项为 save_search_result 的关键字参数字典
+                   （query、search_type、response，可选 enable_llm、user_id、search_id、page_size）
+            
+        Returns:
+            与items顺序一致的搜索ID列表，保存失败的项为None
         """
-        if not self.table:
-            print("❌ DynamoDB表未初始化，无法获取缓存响应")
+        if not self.table or not self.s3_client:
+            logger.error("❌ S3或DynamoDB未初始化，无法保存搜索结果")
+            return [None] * len(items)
+        
+        def prepare(item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            try:
+                return self._prepare_cache_item(**item)
+            except Exception as e:
+                logger.error("❌ 准备缓存项失败 - Exception: %s", e)
+                return None
+        
+        if len(items) > 1:
+            with ThreadPoolExecutor(max_workers=min(_BATCH_UPLOAD_MAX_WORKERS, len(items))) as pool:
+                prepared = list(pool.map(prepare, items))
+        else:
+            prepared = [prepare(item) for item in items]
+        
+        search_ids: List[Optional[str]] = [ddb_item['search_id'] if ddb_item else None for ddb_item in prepared]
+        ddb_items = [ddb_item for ddb_item in prepared if ddb_item]
+        
+        for ddb_item in ddb_items:
+            self._remember_search_id(ddb_item['search_id'])
+        failed_ids = set(self._batch_put_items(ddb_items))
+        for ddb_item in ddb_items:
+            self._invalidate_read_cache(ddb_item['search_id'], ddb_item.get('user_id'))
+        if failed_ids:
+            search_ids = [None if sid in failed_ids else sid for sid in search_ids]
+        
+        logger.debug("✅ 批量保存完成 - 成功: %s/%s", sum(1 for sid in search_ids if sid), len(items))
+        return search_ids
+    
+    def _write_loop(self):
+        """后台写入线程：最多攒25项或等待0.5秒后批量写入"""
+        while True:
+            batch = [self._write_queue.get()]
+            deadline = time.monotonic() + _WRITE_COALESCE_SECONDS
+            while len(batch) < MAX_DYNAMO_BATCH_WRITE_ITEM_COUNT:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._write_queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            try:
+                self.save_search_results_batch(batch)
+            except Exception as e:
+                logger.error("❌ 后台批量写入失败 - Exception: %s", e)
+            finally:
+                for _ in batch:
+                    self._write_queue.task_done()
+    
+    def flush(self, timeout: Optional[float] = _FLUSH_TIMEOUT_SECONDS) -> bool:
+        """
+        等待后台写入队列中的所有结果写入完成
+        
+        Args:
+            timeout: 最长等待秒数，None表示一直等待
+            
+        Returns:
+            队列是否已清空
+        """
+        if self._write_queue is None:
+            return True
+        
+        q = self._write_queue
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with q.all_tasks_done:
+            while q.unfinished_tasks:
+                if deadline is None:
+                    q.all_tasks_done.wait()
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning("⚠️  等待缓存写入超时，仍有 %s 项未写入", q.unfinished_tasks)
+                    return False
+                q.all_tasks_done.wait(remaining)
+        return True
+    
+    def _batch_put_items(self, ddb_items: List[Dict[str, Any]]) -> List[str]:
+        """
+        使用BatchWriteItem写入DynamoDB元数据
+        
+        Returns:
+            最终写入失败的搜索ID列表
+        """
+        # 同一请求中不能出现重复主键（否则整批被拒），同一search_id只保留最后一次写入
+        ddb_items = list({item[self.primary_key]: item for item in ddb_items}.values())
+        
+        failed_ids: List[str] = []
+        for i in range(0, len(ddb_items), MAX_DYNAMO_BATCH_WRITE_ITEM_COUNT):
+            chunk = ddb_items[i:i + MAX_DYNAMO_BATCH_WRITE_ITEM_COUNT]
+            request_items = {
+                self.table_name: [{'PutRequest': {'Item': _to_attribute_values(item)}} for item in chunk]
+            }
+            
+            for attempt in range(_BATCH_WRITE_MAX_RETRIES + 1):
+                try:
+                    response = self.ddb_client.batch_write_item(RequestItems=request_items)
+                except ClientError as e:
+                    logger.error("❌ 批量写入DynamoDB失败 - ClientError: %s", e)
+                    break
+                
+                request_items = response.get('UnprocessedItems') or {}
+                if not request_items:
+                    break
+                
+                # 未处理的项按指数退避后重试
+                time.sleep(min(2 ** attempt * 0.05, 2.0))
+            
+            for request in request_items.get(self.table_name, []):
+                failed_ids.append(request['PutRequest']['Item']['search_id']['S'])
+        
+        if failed_ids:
+            logger.warning("⚠️  %s 项元数据写入DynamoDB失败", len(failed_ids))
+        return failed_ids
+    
+    def get_cached_response_by_query_and_type(self, query_text: str, search_type: str, enable_llm: bool,
+                                              page_size: int) -> Optional[SearchResponse]:
+        """
+        根据查询文本、搜索类型、LLM启用状态和每页大小从缓存中检索第一页的完整SearchResponse。
+        翻页、游标和深度召回的结果写入时不记录page_size，不会在这里命中。
+        优先使用名为 'query_hash-created_at-index' 的GSI（'query_hash' 为哈希键，大小写与空白不同的查询可共享缓存），
+        表中未创建时回退到 'query-created_at-index'（'query' 为哈希键）；两者的范围键均为 'created_at' (Unix timestamp)。
+        """
+        if not self.table or not self.ddb_client:
+            logger.error("❌ DynamoDB表未初始化，无法获取缓存响应")
             return None
 
-        gsi_name = 'query-created_at-index'
-        print(f"🔍 正在尝试从缓存中检索查询: '{query_text}', 类型: {search_type}, LLM: {enable_llm} 使用GSI: {gsi_name}")
+        if self._query_hash_gsi_available:
+            gsi_name, key_attr, key_value = QUERY_HASH_GSI_NAME, 'query_hash', query_hash(query_text)
+        else:
+            gsi_name, key_attr, key_value = QUERY_GSI_NAME, 'query', query_text
+        logger.debug("🔍 正在尝试从缓存中检索查询: '%s', 类型: %s, LLM: %s 使用GSI: %s", query_text, search_type, enable_llm, gsi_name)
 
         try:
-            response = self.table.query(
-                IndexName=gsi_name,
-                KeyConditionExpression='query = :query_val',
-                ExpressionAttributeValues={':query_val': query_text},
-                ScanIndexForward=False  # 获取最新的条目优先
-            )
-
-            items = response.get('Items', [])
-            if not items:
-                print(f"ℹ️  GSI '{gsi_name}' 未找到查询 '{query_text}' 的缓存条目。")
-                return None
-
             # 从最新的条目开始查找完全匹配的缓存
-            for item in items:
-                if item.get('search_type') == search_type and item.get('enable_llm') == enable_llm:
-                    print(f"✅ 找到匹配的缓存元数据 (ID: {item.get(self.primary_key)})。正在从S3获取完整结果...")
-                    s3_key = item.get('s3_key')
-                    if not s3_key:
-                        print(f"❌ 缓存条目 (ID: {item.get(self.primary_key)}) 缺少s3_key。")
-                        continue
-
-                    full_data = self._download_from_s3(s3_key)
+            for item in self._query_matching_items(gsi_name, key_attr, key_value, search_type, enable_llm, page_size):
+                if item.get('search_type') == search_type and item.get('enable_llm') == enable_llm \
+                        and item.get('page_size') == page_size:
+                    logger.debug("✅ 找到匹配的缓存元数据 (ID: %s)。正在获取完整结果...", item.get(self.primary_key))
+                    full_data = self._load_full_data(item)
                     if not full_data:
-                        print(f"❌ 无法从S3 (key: {s3_key}) 下载缓存的搜索结果。")
+                        logger.error("❌ 无法获取缓存的搜索结果 (ID: %s)。", item.get(self.primary_key))
                         continue
                     
-                    # 反序列化 SearchResult 列表
-                    results_list = []
+                    # 反序列化 SearchResult 列表：写入时已由_serialize_search_results规范化，跳过逐项校验
                     serialized_results = full_data.get('results', [])
-                    if isinstance(serialized_results, list):
-                        for sr_data in serialized_results:
-                            try:
-                                results_list.append(SearchResult(**sr_data))
-                            except Exception as e:
-                                print(f"⚠️  反序列化单个SearchResult失败: {sr_data}, 错误: {e}")
+                    if not isinstance(serialized_results, list):
+                        serialized_results = []
+                    _construct = SearchResult.model_construct
+                    results_list = [_construct(**sr_data) for sr_data in serialized_results if isinstance(sr_data, dict)]
                     
                     # 反序列化 SearchResponse
                     try:
-                        cached_response = SearchResponse(
+                        cached_response = SearchResponse.model_construct(
                             search_id=full_data.get('search_id'),
                             total=full_data.get('total_results', 0),
                             results=results_list,
                             searchType=full_data.get('search_type', search_type), # 应与S3中存储的一致
-                            rewrittenTerms=full_data.get('rewritten_terms')
+                            rewrittenTerms=full_data.get('rewritten_terms'),
+                            nextSearchAfter=full_data.get('next_search_after')
                         )
-                        print(f"✅ 已从S3成功加载并反序列化缓存响应 (ID: {cached_response.search_id})")
+                        logger.debug("✅ 已从S3成功加载并反序列化缓存响应 (ID: %s)", cached_response.search_id)
                         return cached_response
                     except Exception as e:
-                        print(f"❌ 反序列化SearchResponse失败 (S3 key: {s3_key}), 错误: {e}")
+                        logger.error("❌ 反序列化SearchResponse失败 (ID: %s), 错误: %s", item.get(self.primary_key), e)
                         continue # 尝试下一个可能的条目（尽管不太可能）
             
-            print(f"ℹ️  对于查询 '{query_text}', 未找到与 search_type='{search_type}' 和 enable_llm={enable_llm} 完全匹配的缓存条目。")
+            logger.debug("ℹ️  对于查询 '%s', 未找到与 search_type='%s' 和 enable_llm=%s 完全匹配的缓存条目。", query_text, search_type, enable_llm)
             return None
 
         except ClientError as e:
+            if gsi_name == QUERY_HASH_GSI_NAME and e.response['Error']['Code'] == 'ValidationException' \
+                    and 'Invalid index name' in e.response['Error']['Message']:
+                logger.warning("⚠️ GSI '%s' 未找到, 改用 '%s'", gsi_name, QUERY_GSI_NAME)
+                self._query_hash_gsi_available = False
+                return self.get_cached_response_by_query_and_type(query_text, search_type, enable_llm, page_size)
             if e.response['Error']['Code'] == 'ResourceNotFoundException' or \
                (e.response['Error']['Code'] == 'ValidationException' and 'Invalid index name' in e.response['Error']['Message']):
-                print(f"❌ GSI '{gsi_name}' 不存在或配置错误。请在DynamoDB表 '{self.table_name}' 上创建它。")
+                logger.error("❌ GSI '%s' 不存在或配置错误。请在DynamoDB表 '%s' 上创建它。", gsi_name, self.table_name)
             else:
-                print(f"❌ 查询缓存失败 (GSI: {gsi_name}) - ClientError: {e}")
+                logger.error("❌ 查询缓存失败 (GSI: %s) - ClientError: %s", gsi_name, e)
             return None
         except Exception as e:
-            print(f"❌ 查询缓存时发生意外错误 (GSI: {gsi_name}) - Exception: {e}")
+            logger.error("❌ 查询缓存时发生意外错误 (GSI: %s) - Exception: %s", gsi_name, e)
             return None
     
+    def _query_matching_items(self, gsi_name: str, key_attr: str, key_value: str, search_type: str, enable_llm: bool,
+                              page_size: int):
+        """
+        按时间倒序逐页查询与类型、LLM状态和每页大小匹配的缓存条目
+        
+        Args:
+            gsi_name: GSI名称
+            key_attr: GSI哈希键属性名（query_hash 或 query）
+            key_value: 哈希键的值
+            search_type: 搜索类型
+            enable_llm: 是否启用LLM评估
+            page_size: 每页结果数
+        
+        类型、LLM状态与每页大小由FilterExpression在服务端过滤，且只返回加载完整结果所需的属性；
+        过滤在Limit之后生效，因此不设Limit，按需通过LastEvaluatedKey翻页，调用方找到可用条目即停止。
+        """
+        kwargs = {
+            'IndexName': gsi_name,
+            'KeyConditionExpression': '#q = :query_val',
+            'FilterExpression': '#st = :search_type AND #llm = :enable_llm AND #ps = :page_size',
+            'ProjectionExpression': '#pk, #st, #llm, #ps, s3_key, results_blob, results_encoding',
+            'ExpressionAttributeNames': {
+                '#pk': self.primary_key,
+                '#q': key_attr,  # query为DynamoDB保留字，统一使用占位符
+                '#st': 'search_type',
+                '#llm': 'enable_llm',
+                '#ps': 'page_size'
+            },
+            'ExpressionAttributeValues': {
+                ':query_val': {'S': key_value},
+                ':search_type': {'S': search_type},
+                ':enable_llm': {'BOOL': enable_llm},
+                ':page_size': {'N': str(page_size)}
+            },
+            'ScanIndexForward': False  # 获取最新的条目优先
+        }
+        while True:
+            # 每次缓存查询都会走这里，直接用低级客户端并手写AttributeValue
+            response = self.ddb_client.query(TableName=self.table_name, **kwargs)
+            for item in response.get('Items', []):
+                yield _from_attribute_values(item)
+            if 'LastEvaluatedKey' not in response:
+                return
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    
     def get_search_result(self, search_id: str) -> Optional[Dict[str, Any]]:
         """
         根据搜索ID获取完整搜索结果
@@ -353,54 +961,157 @@ class SearchCache:  # 类名已从 S3Cache 更改为 SearchCache
             完整搜索结果字典，如果未找到返回None
         """
         if not self.table or not self.s3_client:
-            print("❌ S3或DynamoDB未初始化，无法获取搜索结果")
+            logger.error("❌ S3或DynamoDB未初始化，无法获取搜索结果")
+            return None
+        
+        cached = self._read_cache_get(self._result_cache, search_id)
+        if cached is not None:
+            return dict(cached)
+        if self._known_missing(search_id):
             return None
         
         try:
             # 从DynamoDB获取元数据
-            response = self.table.get_item(Key={self.primary_key: search_id})
+            response = self.ddb_client.get_item(
+                TableName=self.table_name,
+                Key={self.primary_key: {'S': search_id}}
+            )
             
             if 'Item' not in response:
-                print(f"❌ 未找到搜索ID: {search_id}")
+                logger.info("❌ 未找到搜索ID: %s", search_id)
+                self._read_cache_put(self._miss_cache, search_id, True)
                 return None
             
-            metadata = response['Item']
-            s3_key = metadata.get('s3_key')
-            
-            if not s3_key:
-                print(f"❌ 搜索结果缺少S3路径: {search_id}")
-                return None # 或者可以只返回元数据
-            
-            # 从S3获取完整数据
-            full_data = self._download_from_s3(s3_key)
-            if not full_data:
-                print(f"❌ 无法从S3获取搜索结果: {search_id}")
-                return None # 或者可以只返回元数据
-            
-            # 合并元数据和完整数据（特别是results列表）
-            # 注意：DynamoDB中的元数据可能比S3中的旧，或者S3中的数据更完整
-            # 这里我们以S3的数据为准，并用DynamoDB的元数据补充（如果S3数据中没有）
-            final_result = full_data.copy() # 从S3数据开始
-            for key, value in metadata.items():
-                if key not in final_result: # 只添加S3数据中没有的元数据字段
-                    final_result[key] = value
-            
-            # 确保关键字段来自S3（如果存在）
-            if 'results' in full_data:
-                 final_result['results'] = full_data['results']
-            if 'total_results' in full_data:
-                 final_result['total_results'] = full_data['total_results']
-
-
-            return final_result
+            final_result = self._build_full_result(_from_attribute_values(response['Item']))
+            if final_result is None:
+                return None
+            return dict(final_result)
                 
         except ClientError as e:
-            print(f"❌ 获取搜索结果失败 - ClientError: {e}")
+            logger.error("❌ 获取搜索结果失败 - ClientError: %s", e)
             return None
         except Exception as e:
-            print(f"❌ 获取搜索结果失败 - Exception: {e}")
+            logger.error("❌ 获取搜索结果失败 - Exception: %s", e)
             return None
     
+    def _build_full_result(self, metadata: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        读取缓存条目的完整数据并与元数据合并，成功时写入结果读缓存
+        
+        Args:
+            metadata: DynamoDB中的完整缓存条目
+        """
+        search_id = metadata.get(self.primary_key)
+        
+        # 获取完整数据（内联或S3）
+        full_data = self._load_full_data(metadata)
+        if not full_data:
+            logger.error("❌ 无法获取搜索结果: %s", search_id)
+            return None # 或者可以只返回元数据
+        metadata.pop('results_blob', None)
+        
+        # 合并元数据和完整数据（特别是results列表）
+        # 注意：DynamoDB中的元数据可能比S3中的旧，或者S3中的数据更完整
+        # 这里我们以S3的数据为准，并用DynamoDB的元数据补充（如果S3数据中没有）
+        final_result = full_data.copy() # 从S3数据开始
+        for key, value in metadata.items():
+            if key not in final_result: # 只添加S3数据中没有的元数据字段
+                final_result[key] = value
+        
+        # 确保关键字段来自S3（如果存在）
+        if 'results' in full_data:
+             final_result['results'] = full_data['results']
+        if 'total_results' in full_data:
+             final_result['total_results'] = full_data['total_results']
+
+        self._read_cache_put(self._result_cache, search_id, final_result)
+        return final_result
+    
+    def get_search_results_bulk(self, search_ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """
+        批量获取完整搜索结果（如为一页搜索历史补全结果）
+        
+        DynamoDB条目通过BatchGetItem每批最多100个键读取，未处理的键按指数退避重试；
+        随后在线程池中并发读取内联结果或下载S3对象。
+        
+        Args:
+            search_ids: 搜索ID列表
+            
+        Returns:
+            与search_ids顺序一致的完整搜索结果列表，未找到或读取失败的项为None
+        """
+        if not self.table or not self.s3_client:
+            logger.error("❌ S3或DynamoDB未初始化，无法获取搜索结果")
+            return [None] * len(search_ids)
+        
+        found: Dict[str, Dict[str, Any]] = {}
+        pending = []
+        for search_id in dict.fromkeys(search_ids):
+            cached = self._read_cache_get(self._result_cache, search_id)
+            if cached is not None:
+                found[search_id] = cached
+            elif not self._known_missing(search_id):
+                pending.append(search_id)
+        
+        try:
+            items, unprocessed = self._batch_get_items(pending)
+            if items:
+                with ThreadPoolExecutor(max_workers=min(_BATCH_UPLOAD_MAX_WORKERS, len(items))) as pool:
+                    for item, final_result in zip(items, pool.map(self._build_full_result, items)):
+                        if final_result is not None:
+                            found[item[self.primary_key]] = final_result
+            
+            # 重试后仍未处理的键不能视为不存在
+            fetched = {item[self.primary_key] for item in items} | set(unprocessed)
+            for search_id in pending:
+                if search_id not in fetched:
+                    self._read_cache_put(self._miss_cache, search_id, True)
+        except ClientError as e:
+            logger.error("❌ 批量获取搜索结果失败 - ClientError: %s", e)
+        except Exception as e:
+            logger.error("❌ 批量获取搜索结果失败 - Exception: %s", e)
+        
+        return [dict(found[sid]) if sid in found else None for sid in search_ids]
+    
+    def _batch_get_items(self, search_ids: List[str],
+                         projection: Optional[Dict[str, Any]] = None) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        使用BatchGetItem读取缓存条目
+        
+        Args:
+            search_ids: 搜索ID列表
+            projection: 可选的ProjectionExpression参数（如self._metadata_projection），缺省读取完整条目
+        
+        Returns:
+            (读取到的条目列表（不保证顺序）, 多次重试后仍未处理的搜索ID列表)
+        """
+        items: List[Dict[str, Any]] = []
+        unprocessed: List[str] = []
+        for i in range(0, len(search_ids), MAX_DYNAMO_BATCH_GET_ITEM_COUNT):
+            chunk = search_ids[i:i + MAX_DYNAMO_BATCH_GET_ITEM_COUNT]
+            request_items = {
+                self.table_name: {'Keys': [{self.primary_key: {'S': sid}} for sid in chunk], **(projection or {})}
+            }
+            
+            for attempt in range(_BATCH_WRITE_MAX_RETRIES + 1):
+                response = self.ddb_client.batch_get_item(RequestItems=request_items)
+                items.extend(
+                    _from_attribute_values(item) for item in response.get('Responses', {}).get(self.table_name, [])
+                )
+                
+                request_items = response.get('UnprocessedKeys') or {}
+                if not request_items:
+                    break
+                
+                # 未处理的键按指数退避后重试
+                time.sleep(min(2 ** attempt * 0.05, 2.0))
+            
+            if request_items:
+                keys = request_items[self.table_name]['Keys']
+                unprocessed.extend(key[self.primary_key]['S'] for key in keys)
+                logger.warning("⚠️  %s 个键多次重试后仍未读取", len(keys))
+        return items, unprocessed
+    
     def get_search_metadata(self, search_id: str) -> Optional[Dict[str, Any]]:
         """
         只获取搜索元数据（不包含完整结果）
@@ -412,23 +1123,37 @@ class SearchCache:  # 类名已从 S3Cache 更改为 SearchCache
             搜索元数据字典，如果未找到返回None
         """
         if not self.table:
-            print("❌ DynamoDB表未初始化，无法获取搜索元数据")
+            logger.error("❌ DynamoDB表未初始化，无法获取搜索元数据")
+            return None
+        
+        cached = self._read_cache_get(self._meta_cache, search_id)
+        if cached is not None:
+            return dict(cached)
+        if self._known_missing(search_id):
             return None
         
         try:
-            response = self.table.get_item(Key={self.primary_key: search_id})
+            # 只读取元数据属性，内联的完整结果不经网络传输
+            response = self.ddb_client.get_item(
+                TableName=self.table_name,
+                Key={self.primary_key: {'S': search_id}},
+                **self._metadata_projection
+            )
             
             if 'Item' in response:
-                return response['Item']
+                item = _from_attribute_values(response['Item'])
+                self._read_cache_put(self._meta_cache, search_id, item)
+                return dict(item)
             else:
-                print(f"❌ 未找到搜索ID: {search_id}")
+                logger.info("❌ 未找到搜索ID: %s", search_id)
+                self._read_cache_put(self._miss_cache, search_id, True)
                 return None
                 
         except ClientError as e:
-            print(f"❌ DynamoDB查询失败 - ClientError: {e}")
+            logger.error("❌ DynamoDB查询失败 - ClientError: %s", e)
             return None
         except Exception as e:
-            print(f"❌ DynamoDB查询失败 - Exception: {e}")
+            logger.error("❌ DynamoDB查询失败 - Exception: %s", e)
             return None
     
     def get_user_search_history(self, user_id: str, limit: int = 50) -> List[Dict[str, Any]]:
@@ -443,43 +1168,45 @@ class SearchCache:  # 类名已从 S3Cache 更改为 SearchCache
             搜索历史列表
         """
         if not self.table:
-            print("❌ DynamoDB表未初始化，无法获取搜索历史")
+            logger.error("❌ DynamoDB表未初始化，无法获取搜索历史")
             return []
         
+        cached = self._read_cache_get(self._history_cache, (user_id, limit))
+        if cached is not None:
+            return list(cached)
+        
+        # 使用GSI查询用户搜索历史（需要在DynamoDB中创建GSI: user_id-created_at-index 或 user_id-timestamp-index）
+        # 优先尝试 'user_id-created_at-index'，不存在时回退到 'user_id-timestamp-index'；
+        # 确认可用的GSI后记住它，之后的查询不再先失败一次
+        gsi_names = (self._history_gsi,) if self._history_gsi else _HISTORY_GSI_NAMES
+        gsi_name = gsi_names[0]
         try:
-            # 使用GSI查询用户搜索历史（需要在DynamoDB中创建GSI: user_id-timestamp-index 或 user_id-created_at-index）
-            # 假设GSI的排序键是 timestamp 或 created_at
-            # 我们将尝试 'user_id-created_at-index'，如果它不存在，则回退到 'user_id-timestamp-index'
-            gsi_name = 'user_id-created_at-index' 
-            try:
-                response = self.table.query(
-                    IndexName=gsi_name,
-                    KeyConditionExpression='user_id = :user_id',
-                    ExpressionAttributeValues={':user_id': user_id},
-                    ScanIndexForward=False,  # 按时间戳降序排列
-                    Limit=limit
-                )
-            except ClientError as ce:
-                if ce.response['Error']['Code'] == 'ValidationException' and 'Invalid index name' in ce.response['Error']['Message']:
-                    print(f"⚠️ GSI '{gsi_name}' 未找到, 尝试 'user_id-timestamp-index'")
-                    gsi_name = 'user_id-timestamp-index' # 备用GSI名称
+            for gsi_name in gsi_names:
+                try:
                     response = self.table.query(
                         IndexName=gsi_name,
-                        KeyConditionExpression='user_id = :user_id',
                         ExpressionAttributeValues={':user_id': user_id},
-                        ScanIndexForward=False,
-                        Limit=limit
+                        Limit=limit,
+                        **self._history_query_template
                     )
-                else:
-                    raise ce # 重新抛出其他ClientError
+                    self._history_gsi = gsi_name
+                    break
+                except ClientError as ce:
+                    if gsi_name != gsi_names[-1] and ce.response['Error']['Code'] == 'ValidationException' \
+                            and 'Invalid index name' in ce.response['Error']['Message']:
+                        logger.warning("⚠️ GSI '%s' 未找到, 尝试 '%s'", gsi_name, gsi_names[-1])
+                        continue
+                    raise # 重新抛出其他ClientError
 
-            return response.get('Items', [])
+            items = response.get('Items', [])
+            self._read_cache_put(self._history_cache, (user_id, limit), items)
+            return list(items)
             
         except ClientError as e:
-            print(f"❌ 查询用户搜索历史失败 (GSI: {gsi_name}) - ClientError: {e}")
+            logger.error("❌ 查询用户搜索历史失败 (GSI: %s) - ClientError: %s", gsi_name, e)
             return []
         except Exception as e:
-            print(f"❌ 查询用户搜索历史失败 (GSI: {gsi_name}) - Exception: {e}")
+            logger.error("❌ 查询用户搜索历史失败 (GSI: %s) - Exception: %s", gsi_name, e)
             return []
     
     def delete_search_result(self, search_id: str) -> bool:
@@ -493,7 +1220,7 @@ class SearchCache:  # 类名已从 S3Cache 更改为 SearchCache
             删除是否成功
         """
         if not self.table or not self.s3_client:
-            print("❌ S3或DynamoDB未初始化，无法删除搜索结果")
+            logger.error("❌ S3或DynamoDB未初始化，无法删除搜索结果")
             return False
         
         try:
@@ -501,7 +1228,7 @@ class SearchCache:  # 类名已从 S3Cache 更改为 SearchCache
             metadata = self.get_search_metadata(search_id)
             if not metadata:
                 # 如果DynamoDB中没有记录，可能S3中单独存在（不太可能），或者记录已被删除
-                print(f"ℹ️  未找到搜索结果元数据: {search_id}。可能已被删除或S3对象单独存在。")
+                logger.debug("ℹ️  未找到搜索结果元数据: %s。可能已被删除或S3对象单独存在。", search_id)
                 # 尝试直接基于search_id构造可能的S3路径并删除（如果策略允许）
                 # 但更安全的做法是如果元数据没有就不操作S3，避免误删
                 # 此处我们选择如果元数据不存在则不尝试删除S3对象
@@ -509,46 +1236,106 @@ class SearchCache:  # 类名已从 S3Cache 更改为 SearchCache
 
             s3_key = metadata.get('s3_key')
             
-            # 删除S3对象
+            # 删除S3对象（与DynamoDB删除并发执行）
+            s3_future = None
             if s3_key:
+                logger.debug("🗑️  正在尝试删除S3对象: %s 从存储桶 %s", s3_key, self.bucket_name)
+                s3_future = _delete_executor.submit(
+                    self.s3_client.delete_object,
+                    Bucket=self.bucket_name,
+                    Key=s3_key
+                )
+            else:
+                logger.debug("ℹ️  元数据中未包含S3键，跳过S3对象删除 for search_id: %s", search_id)
+
+            # 删除DynamoDB项目
+            logger.debug("🗑️  正在删除DynamoDB项目: %s", search_id)
+            self.table.delete_item(Key={self.primary_key: search_id})
+            self._invalidate_read_cache(search_id, metadata.get('user_id'))
+            logger.debug("✅ DynamoDB搜索结果已删除 - ID: %s", search_id)
+            
+            if s3_future is not None:
                 try:
-                    print(f"🗑️  正在尝试删除S3对象: {s3_key} 从存储桶 {self.bucket_name}")
-                    self.s3_client.delete_object(
-                        Bucket=self.bucket_name,
-                        Key=s3_key
-                    )
-                    print(f"✅ S3对象已删除: {s3_key}")
+                    s3_future.result()
+                    logger.debug("✅ S3对象已删除: %s", s3_key)
                 except ClientError as e:
                     # 根据错误类型处理，例如NoSuchKey也算成功删除
                     if e.response['Error']['Code'] == 'NoSuchKey':
-                        print(f"✅ S3对象已删除 (之前不存在): {s3_key}")
+                        logger.debug("✅ S3对象已删除 (之前不存在): %s", s3_key)
                     else:
-                        print(f"⚠️  S3对象删除失败: {e}")
-                        # 根据策略，可以选择即使S3删除失败也继续删除DynamoDB记录
-                        # 或者在这里返回False，表示删除未完全成功
-            else:
-                print(f"ℹ️  元数据中未包含S3键，跳过S3对象删除 for search_id: {search_id}")
-
-            # 删除DynamoDB项目
-            print(f"🗑️  正在删除DynamoDB项目: {search_id}")
-            self.table.delete_item(Key={self.primary_key: search_id})
-            print(f"✅ DynamoDB搜索结果已删除 - ID: {search_id}")
+                        # S3删除失败不影响DynamoDB记录的删除，对象由生命周期规则兜底
+                        logger.warning("⚠️  S3对象删除失败: %s", e)
+            return True
+            
+        except ClientError as e:
+            logger.error("❌ 删除失败 - ClientError: %s", e)
+            return False
+        except Exception as e:
+            logger.error("❌ 删除失败 - Exception: %s", e)
+            return False
+    
+    def delete_search_results_batch(self, search_ids: List[str]) -> bool:
+        """
+        批量删除搜索结果：元数据通过BatchGetItem每批100个读取，S3对象通过delete_objects
+        每次最多1000个删除，DynamoDB项目通过batch_writer每批25项删除
+        
+        Args:
+            search_ids: 搜索ID列表
+            
+        Returns:
+            删除是否全部成功
+        """
+        if not self.table or not self.s3_client:
+            logger.error("❌ S3或DynamoDB未初始化，无法删除搜索结果")
+            return False
+        
+        search_ids = list(dict.fromkeys(search_ids))
+        if not search_ids:
             return True
+        
+        try:
+            # 只读取元数据属性（含s3_key），不取内联的完整结果
+            metadata_list, unprocessed = self._batch_get_items(search_ids, self._metadata_projection)
+            success = not unprocessed
+            s3_keys = [m['s3_key'] for m in metadata_list if m.get('s3_key')]
+            for i in range(0, len(s3_keys), S3_DELETE_OBJECTS_MAX_KEYS):
+                chunk = s3_keys[i:i + S3_DELETE_OBJECTS_MAX_KEYS]
+                response = self.s3_client.delete_objects(
+                    Bucket=self.bucket_name,
+                    Delete={'Objects': [{'Key': key} for key in chunk], 'Quiet': True}
+                )
+                errors = response.get('Errors', [])
+                if errors:
+                    success = False
+                    logger.warning("⚠️  %s 个S3对象删除失败: %s", len(errors), errors[:3])
+            
+            with self.table.batch_writer() as writer:
+                for metadata in metadata_list:
+                    writer.delete_item(Key={self.primary_key: metadata[self.primary_key]})
+            for metadata in metadata_list:
+                self._invalidate_read_cache(metadata[self.primary_key], metadata.get('user_id'))
+            
+            logger.debug("✅ 批量删除完成 - DynamoDB项目: %s, S3对象: %s", len(metadata_list), len(s3_keys))
+            return success
             
         except ClientError as e:
-            print(f"❌ 删除失败 - ClientError: {e}")
+            logger.error("❌ 批量删除失败 - ClientError: %s", e)
             return False
         except Exception as e:
-            print(f"❌ 删除失败 - Exception: {e}")
+            logger.error("❌ 批量删除失败 - Exception: %s", e)
             return False
     
     def get_cache_stats(self) -> Dict[str, Any]:
         """
-        获取缓存统计信息
+        获取缓存统计信息（结果缓存 _STATS_CACHE_TTL 秒）
         
         Returns:
             缓存统计信息字典
         """
+        cached_stats, fetched_at = self._stats_cache
+        if cached_stats is not None and time.monotonic() - fetched_at < _STATS_CACHE_TTL:
+            return dict(cached_stats)
+        
         stats = {}
         
         # DynamoDB统计
@@ -583,4 +1370,64 @@ class SearchCache:  # 类名已从 S3Cache 更改为 SearchCache
             stats["s3_error"] = "S3客户端未初始化"
         
         stats["region"] = self.region_name # 整体配置的区域
-        return stats 
\ No newline at end of file
+        
+        # 只缓存完整成功的统计结果，出错时下次调用重新获取
+        if "dynamodb_error" not in stats and "s3_error" not in stats:
+            self._stats_cache = (stats, time.monotonic())
+        return dict(stats)     
+    # ================================
+    # 异步接口：在线程池中执行同步boto3调用，供FastAPI异步处理函数使用，避免阻塞事件循环
+    # ================================
+    
+    async def asave_search_result(self, *args, **kwargs) -> Optional[str]:
+        """save_search_result 的异步版本"""
+        return await asyncio.to_thread(self.save_search_result, *args, **kwargs)
+    
+    async def asave_search_results_batch(self, items: List[Dict[str, Any]]) -> List[Optional[str]]:
+        """save_search_results_batch 的异步版本（S3上传在线程池中并发，元数据批量写入）"""
+        return await asyncio.to_thread(self.save_search_results_batch, items)
+    
+    async def aget_cached_response_by_query_and_type(self, *args, **kwargs) -> Optional[SearchResponse]:
+        """get_cached_response_by_query_and_type 的异步版本"""
+        return await asyncio.to_thread(self.get_cached_response_by_query_and_type, *args, **kwargs)
+    
+    async def aget_search_result(self, search_id: str) -> Optional[Dict[str, Any]]:
+        """get_search_result 的异步版本"""
+        return await asyncio.to_thread(self.get_search_result, search_id)
+    
+    async def aget_search_results_bulk(self, search_ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """get_search_results_bulk 的异步版本"""
+        return await asyncio.to_thread(self.get_search_results_bulk, search_ids)
+    
+    async def aget_search_metadata(self, search_id: str) -> Optional[Dict[str, Any]]:
+        """get_search_metadata 的异步版本"""
+        return await asyncio.to_thread(self.get_search_metadata, search_id)
+    
+    async def adelete_search_result(self, search_id: str) -> bool:
+        """delete_search_result 的异步版本"""
+        return await asyncio.to_thread(self.delete_search_result, search_id)
+    
+    async def adelete_search_results_batch(self, search_ids: List[str]) -> bool:
+        """delete_search_results_batch 的异步版本"""
+        return await asyncio.to_thread(self.delete_search_results_batch, search_ids)
+    
+    async def aget_cache_stats(self) -> Dict[str, Any]:
+        """get_cache_stats 的异步版本"""
+        return await asyncio.to_thread(self.get_cache_stats)
+    
+    async def aput_item(self, item: Dict[str, Any]):
+        """直接写入一条DynamoDB项目（如异步任务的错误状态）"""
+        self._remember_search_id(item.get(self.primary_key))
+        result = await asyncio.to_thread(
+            self.ddb_client.put_item, TableName=self.table_name, Item=_to_attribute_values(item)
+        )
+        self._invalidate_read_cache(item.get(self.primary_key), item.get('user_id'))
+        return result
+    
+    async def ascan(self, **kwargs) -> Dict[str, Any]:
+        """DynamoDB scan 的异步版本"""
+        return await asyncio.to_thread(self.table.scan, **kwargs)
+    
+    async def aflush(self, timeout: Optional[float] = _FLUSH_TIMEOUT_SECONDS) -> bool:
+        """flush 的异步版本"""
+        return await asyncio.to_thread(self.flush, timeout)
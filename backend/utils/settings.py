@@ -23,13 +23,26 @@ class Settings(BaseSettings):
     OPENSEARCH_USERNAME: str = os.getenv("OPENSEARCH_USERNAME", "")
     OPENSEARCH_PASSWORD: str = os.getenv("OPENSEARCH_PASSWORD", "")
     OPENSEARCH_INDEX_NAME: str = os.getenv("OPENSEARCH_INDEX_NAME", "")
+    OPENSEARCH_MAX_CONNECTIONS: int = int(os.getenv("OPENSEARCH_MAX_CONNECTIONS", "50"))
+    
+    # 混合搜索融合配置：normalization（归一化加权pipeline）或 rrf（Reciprocal Rank Fusion，需OpenSearch 2.19+）
+    HYBRID_FUSION: str = os.getenv("HYBRID_FUSION", "normalization").lower()
+    HYBRID_SEARCH_PIPELINE: str = os.getenv("HYBRID_SEARCH_PIPELINE", "nlp-search-pipeline")
+    RRF_SEARCH_PIPELINE: str = os.getenv("RRF_SEARCH_PIPELINE", "rrf-pipeline")
+    HYBRID_PAGINATION_DEPTH: int = int(os.getenv("HYBRID_PAGINATION_DEPTH", "0"))  # 0表示不发送该参数
     
     # SageMaker配置
     SAGEMAKER_ENDPOINT_NAME: str = os.getenv("SAGEMAKER_ENDPOINT_NAME", "")
     SAGEMAKER_ENDPOINT_RERANK_NAME: Optional[str] = os.getenv("SAGEMAKER_ENDPOINT_RERANK_NAME")
+    EMBEDDING_MAX_BATCH: int = int(os.getenv("EMBEDDING_MAX_BATCH", "16"))
+    EMBEDDING_MAX_WAIT_MS: float = float(os.getenv("EMBEDDING_MAX_WAIT_MS", "8"))
+    EMBEDDING_ACCEPT_NPY: bool = os.getenv("EMBEDDING_ACCEPT_NPY", "false").lower() == "true"  # 端点支持时使用二进制npy输出
+    EMBEDDING_DTYPE: str = os.getenv("EMBEDDING_DTYPE", "float32")  # float32 或 float16
     
     # 功能开关
     ENABLE_RERANK: bool = os.getenv("ENABLE_RERANK", "true").lower() == "true"
+    RERANK_TOP_K: int = int(os.getenv("RERANK_TOP_K", "500"))  # 只重排初始得分最高的前K条
+    RERANK_BATCH_SIZE: int = int(os.getenv("RERANK_BATCH_SIZE", "32"))  # 单次重排序端点调用的标题数
     
     # OpenAI配置
     OPENAI_API_KEY: Optional[str] = os.getenv("OPENAI_API_KEY")
@@ -38,8 +51,16 @@ class Settings(BaseSettings):
     ENABLE_CACHE: bool = os.getenv("ENABLE_CACHE", "true").lower() == "true"
     DYNAMODB_TABLE_NAME: str = os.getenv("DYNAMODB_TABLE_NAME", "asyncSearchCache")
     DYNAMODB_REGION: str = os.getenv("DYNAMODB_REGION", "us-east-1")
+    DYNAMODB_PRIMARY_KEY: Optional[str] = os.getenv("DYNAMODB_PRIMARY_KEY")  # 表主键名，未设置时启动时通过describe_table检测
     AWS_ACCESS_KEY_ID: Optional[str] = os.getenv("AWS_ACCESS_KEY_ID")
     AWS_SECRET_ACCESS_KEY: Optional[str] = os.getenv("AWS_SECRET_ACCESS_KEY")
+    CACHE_BACKGROUND_WRITES: bool = os.getenv("CACHE_BACKGROUND_WRITES", "true").lower() == "true"  # 后台线程攒批写入缓存
+    CACHE_BLOOM_CAPACITY: int = int(os.getenv("CACHE_BLOOM_CAPACITY", "0"))  # 大于0时启用search_id布隆过滤器（仅限单进程写入的部署）
+    CACHE_INLINE_MAX_BYTES: int = int(os.getenv("CACHE_INLINE_MAX_BYTES", str(350 * 1024)))  # 压缩后不超过该大小的结果直接存DynamoDB，0表示总是存S3
+    
+    # 进程内缓存配置
+    LOCAL_CACHE_MAXSIZE: int = int(os.getenv("LOCAL_CACHE_MAXSIZE", "2048"))
+    LOCAL_CACHE_TTL: int = int(os.getenv("LOCAL_CACHE_TTL", "300"))
     
     # S3缓存配置
     S3_BUCKET_NAME: str = os.getenv("S3_BUCKET", "async-papaer-search-results")
@@ -48,7 +69,7 @@ class Settings(BaseSettings):
     # 异步LLM评估配置
     ENABLE_ASYNC_LLM: bool = os.getenv("ENABLE_ASYNC_LLM", "true").lower() == "true"
     LLM_MAX_WORKERS: int = int(os.getenv("LLM_MAX_WORKERS", "5"))
-    LLM_BATCH_SIZE: int = int(os.getenv("LLM_BATCH_SIZE", "10"))
+    LLM_BATCH_SIZE: int = int(os.getenv("LLM_BATCH_SIZE", "32"))
     LLM_RATE_LIMIT: float = float(os.getenv("LLM_RATE_LIMIT", "1.0"))
     
     class Config:
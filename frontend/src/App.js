@@ -144,7 +144,8 @@ function App() {
           page: 1,
           pageSize: 10000, // 获取更多结果用于本地缓存
           searchType: searchType,
-          enableLlm: enableLlm
+          enableLlm: enableLlm,
+          deepRecall: true // 关键词结果不足时使用向量检索补充
         });
         
         const searchTimeValue = (Date.now() - startTime) / 1000;
@@ -35,7 +35,8 @@ function App() {
           query: query,
           page: newPage,
           pageSize: pageSize,
-          searchType: searchType
+          searchType: searchType,
+          deepRecall: true
         }
       });
       setResults(response.data.results);